@@ -0,0 +1,85 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from ventilation_simulator.app import stubs
+from ventilation_simulator.app.api import JobRunner, add_routes, job_inputs
+from ventilation_simulator.app.registry import CaseRegistry
+from ventilation_simulator.app.stubs import ROOT, StubExecutor
+
+
+def test_job_inputs():
+    inputs = job_inputs({"inlet": "left", "outlet": "right", "windSpeed": 8})
+    assert inputs["inlet"] == "(0 4 7 3)"
+    assert inputs["outlet"] == "(1 2 6 5)"
+    assert inputs["windDirection"] == "(-1 0 0)"
+    assert inputs["windSpeed"] == 8
+    assert inputs["aeroRoughness"] == "0.0002"
+
+    for params in [{"inlet": "up"}, {"inlet": "back"}, {"length": -1}, {"snapshots": 1.5}, \
+                   {"solverPreset": "slow"}, {"windDirection": "(1 0 0)"}, {"colour": "red"}]:
+        with pytest.raises(ValueError):
+            job_inputs(params)
+
+
+async def serve(jobs):
+    app = web.Application()
+    add_routes(app, jobs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    return runner, "http://localhost:{0}/api/jobs".format(runner.addresses[0][1])
+
+
+def form(name, params):
+    data = aiohttp.FormData()
+    data.add_field("files", stubs.STL, filename=name)
+    data.add_field("params", json.dumps(params))
+    return data
+
+
+def test_concurrent_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    jobs = JobRunner(registry, StubExecutor(), str(tmp_path), max_jobs=2)
+
+    async def scenario():
+        runner, url = await serve(jobs)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, data=form("box.stl", {"colour": "red"})) as response:
+                    assert response.status == 400
+                ids = []
+                for speed in [4, 6, 8]:
+                    async with session.post(url, data=form("box.stl", {"windSpeed": speed})) as response:
+                        assert response.status == 202
+                        ids.append((await response.json())["id"])
+                async with session.get(url + "/" + ids[0] + "/results") as response:
+                    assert response.status == 409
+                while jobs.tasks:
+                    await asyncio.sleep(0.05)
+                records = []
+                for job_id in ids:
+                    async with session.get(url + "/" + job_id) as response:
+                        records.append(await response.json())
+                async with session.get(url + "/" + ids[0] + "/results", params={"parts": "fields"}) as response:
+                    assert response.status == 200
+                    archive = await response.read()
+        finally:
+            await runner.cleanup()
+        return records, archive
+
+    records, archive = asyncio.run(scenario())
+    registry.close()
+    assert [record["status"] for record in records] == ["completed"] * 3
+    assert [record["inputs"]["windSpeed"] for record in records] == [4, 6, 8]
+    assert records[0]["metrics"]["converged"] is True
+    assert records[0]["artifacts"]["fields"] == stubs.END_TIME
+    assert any(name.endswith("/{0}/U".format(stubs.END_TIME)) for name in zipfile.ZipFile(io.BytesIO(archive)).namelist())
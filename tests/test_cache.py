@@ -0,0 +1,42 @@
+from ventilation_simulator.app.cache import LRUCache
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = LRUCache(30)
+    cache.put("a", "A", 10)
+    cache.put("b", "B", 10)
+    cache.put("c", "C", 10)
+    assert cache.get("a") == "A"  # a becomes the most recently used
+    cache.put("d", "D", 10)
+    assert "b" not in cache
+    assert [key in cache for key in "acd"] == [True, True, True]
+    assert cache.nbytes == 30
+
+
+def test_byte_limit():
+    cache = LRUCache(25)
+    for key in "abc":
+        cache.put(key, key, 10)
+    assert len(cache) == 2 and cache.nbytes == 20
+    # replacing an entry accounts for its new size
+    cache.put("c", "C", 15)
+    assert cache.get("c") == "C" and cache.nbytes == 25 and "b" in cache
+    cache.put("c", "C", 16)
+    assert cache.nbytes == 16 and cache.get("b", "missing") == "missing"
+
+
+def test_entry_larger_than_the_limit_is_not_stored():
+    cache = LRUCache(10)
+    cache.put("a", "A", 5)
+    assert cache.put("big", "B", 11) is False
+    assert "big" not in cache
+    assert cache.get("a") == "A" and cache.nbytes == 5
+
+
+def test_clear():
+    cache = LRUCache(10)
+    cache.put("a", "A", 5)
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0 and cache.get("a") is None
+    cache.put("b", "B", 10)
+    assert cache.get("b") == "B"
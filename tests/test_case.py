@@ -0,0 +1,175 @@
+import asyncio
+import os
+
+from ventilation_simulator.app import stubs
+from ventilation_simulator.app.case import Case, reap_cases
+from ventilation_simulator.app.registry import CaseRegistry, REGISTRY_FILE
+from ventilation_simulator.app.stubs import ROOT, StubExecutor
+
+
+def box_case(registry, executor, data_dir):
+    case = Case.create(registry, executor, data_dir, inputs={
+        "inlet": "(0 1 5 4)", "outlet": "(3 7 6 2)", "windDirection": "(0 -1 0)", "aeroRoughness": "0.0002",
+    })
+    os.makedirs(os.path.join(case.case_dir, 'constant', 'triSurface'))
+    with open(os.path.join(case.case_dir, 'constant', 'triSurface', 'box.stl'), "wb") as fw:
+        fw.write(stubs.STL)
+    case.files = ['box.stl']
+    return case
+
+
+def test_rerun_skips_configure_and_check_until_the_mesh_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    executor = StubExecutor()
+    case = box_case(registry, executor, str(tmp_path))
+    decompose = os.path.join(case.case_dir, 'system', 'decomposeParDict.orig')
+
+    def set_and_simulate():
+        case.removeHistory()
+        asyncio.run(case.run_set())
+        case.clear_results()
+        executor.commands.clear()
+        asyncio.run(case.run_simulation())
+        return list(executor.commands)
+
+    assert set_and_simulate()[0] == 'checkMesh'
+    assert "scotch" in open(decompose).read()
+    assert "configure" not in case.metadata["runs"][-1]["timings"]
+
+    # the same inputs reuse the configuration and the mesh check, the solver runs again
+    case.clear_results()
+    executor.commands.clear()
+    timings = asyncio.run(case.simulate_pipeline().run())
+    assert timings["configure"] is None and timings["checkMesh"] is None
+    assert executor.commands[0] == 'decomposePar' and 'simpleFoam' in executor.commands
+
+    # a new mesh rewrites decomposeParDict.orig, configure writes it again before decomposing
+    case.length = 6
+    commands = set_and_simulate()
+    assert commands[0] == 'checkMesh'
+    assert "scotch" in open(decompose).read()
+    registry.close()
+
+
+def test_fork_keeps_the_signatures_of_its_parent(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    executor = StubExecutor()
+    parent = box_case(registry, executor, str(tmp_path))
+    parent.removeHistory()
+    asyncio.run(parent.run_set())
+    parent.clear_results()
+    asyncio.run(parent.run_simulation())
+
+    # a copy with the same inputs meshes nothing again
+    case = parent.fork()
+    assert case.case_dir != parent.case_dir
+    case.removeHistory()
+    timings = asyncio.run(case.set_pipeline().run())
+    assert timings == {"features.box": None, "block": None, "mesh": None}
+
+    # nor does it configure or check the mesh again, the solver runs
+    case = parent.fork()
+    case.clear_results()
+    executor.commands.clear()
+    timings = asyncio.run(case.simulate_pipeline().run())
+    assert timings["configure"] is None and timings["checkMesh"] is None
+    assert timings["simpleFoam"] is not None
+    assert executor.commands[0] == 'decomposePar'
+
+    # other parameters configure again on the copied mesh
+    case = parent.fork()
+    case.windSpeed = 8
+    case.clear_results()
+    timings = asyncio.run(case.simulate_pipeline().run())
+    assert timings["configure"] is not None and timings["checkMesh"] is None
+    registry.close()
+
+
+def test_potential_flow_initialization_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    case = box_case(registry, StubExecutor(), str(tmp_path))
+    stages = case.simulate_pipeline().stages
+    assert stages["simpleFoam"].after == ["potentialFoam"]
+
+    case.potentialInit = False
+    stages = case.simulate_pipeline().stages
+    assert "potentialFoam" not in stages
+    assert stages["simpleFoam"].after == ["renumberMesh"]
+    registry.close()
+
+
+def test_iterations_compared_on_the_same_setup(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    case = box_case(registry, StubExecutor(), str(tmp_path))
+    case.removeHistory()
+    asyncio.run(case.run_set())
+
+    def simulate(**inputs):
+        for name, value in inputs.items():
+            setattr(case, name, value)
+        case.clear_results()
+        asyncio.run(case.run_simulation())
+        return case.metadata["runs"][-1]["setup"]
+
+    setup = simulate(potentialInit=True)
+    assert simulate(potentialInit=False) == setup
+    assert case.metadata["iterations"][setup] == {"initialized": 1, "uninitialized": 1, "saved": 0}
+
+    # another wind speed is not compared with the runs before
+    other = simulate(windSpeed=8)
+    assert other != setup
+    assert case.metadata["iterations"][other] == {"uninitialized": 1}
+    registry.close()
+
+
+def test_reap_cases_of_a_previous_server(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    registry = CaseRegistry(str(tmp_path / REGISTRY_FILE))
+    unused = box_case(registry, StubExecutor(), str(tmp_path))
+    running = box_case(registry, StubExecutor(), str(tmp_path))
+    running.update("running")
+    registry.close()
+
+    assert reap_cases(str(tmp_path)) == (1, 1)
+    assert not os.path.exists(unused.case_dir)
+    registry = CaseRegistry(str(tmp_path / REGISTRY_FILE))
+    assert registry.get(unused.case_id) is None
+    assert registry.get(running.case_id)["status"] == "failed"
+    assert os.path.isdir(running.case_dir)
+    registry.close()
+    assert reap_cases(str(tmp_path)) == (0, 0)
+
+
+def control_dict(tmp_path, profile):
+    registry = CaseRegistry(str(tmp_path / "{0}.db".format(profile)))
+    case = Case.create(registry, StubExecutor(), str(tmp_path), inputs={
+        "windDirection": "(0 -1 0)", "aeroRoughness": "0.0002", "simTime": 300, "snapshots": 4,
+        "height": 5, "outputProfile": profile,
+    })
+    case.simplefoam()
+    registry.close()
+    with open(os.path.join(case.case_dir, 'system', 'controlDict'), "r", encoding="utf-8") as fr:
+        return fr.read()
+
+
+def test_output_profiles_rewrite_control_dict(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    full = control_dict(tmp_path, "full")
+    assert "writeFormat     binary;\n" in full and "writeInterval   75;\n" in full
+    assert "functions" not in full
+
+    # the lean profile writes the volume once and samples the snapshots on slices and probes
+    lean = control_dict(tmp_path, "lean")
+    assert "writeFormat     ascii;\n" in lean
+    assert "writePrecision  6;\n" in lean
+    assert "writeCompression on;\n" in lean
+    assert "writeInterval   300;\n" in lean
+    assert "        writeInterval   75;\n" in lean
+    assert lean.count("type        cuttingPlane;") == 7
+    assert "(0 0 2.0)" in lean and "(0 0 5.0)" not in lean
+    assert lean.count("{") == lean.count("}")
+    assert lean.rstrip().endswith("// ************************************************************************* //")
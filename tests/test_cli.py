@@ -0,0 +1,15 @@
+import argparse
+
+from ventilation_simulator.app.cli import add_arguments, parse_options
+
+
+def test_options_are_parsed_apart_from_the_server():
+    server_cli = add_arguments(argparse.ArgumentParser())
+    argv = ["--port", "8080", "--executor", "batch", "--batch-timeout", "60", "--max-jobs", "3"]
+
+    args = parse_options(argv)
+    assert (args.executor, args.batch_timeout, args.max_jobs) == ("batch", 60, 3)
+    assert parse_options([]).batch_status == "squeue -h -o %T -j"
+    # reading the options again leaves the command line of the server as it was
+    parse_options(argv)
+    assert server_cli.parse_known_args(argv)[0].max_jobs == 3
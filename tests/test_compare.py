@@ -0,0 +1,41 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ventilation_simulator.app.compare import difference, grid_dims, plane, shared_bounds, slice_index, \
+    symmetric_range, velocity_grid
+
+
+def test_shared_bounds():
+    assert shared_bounds([-5, 5, -5, 5, 0, 5], [-8, 8, -4, 4, 0, 10]) == [-5, 5, -4, 4, 0, 5]
+    with pytest.raises(ValueError):
+        shared_bounds([-5, 5, -5, 5, 0, 5], [6, 8, -5, 5, 0, 5])
+
+
+def test_grid_dims():
+    dims = grid_dims([-5, 5, -5, 5, 0, 5], points=2000)
+    assert dims[0] == dims[1] and dims[0] > dims[2] >= 2
+    assert 1000 < dims[0] * dims[1] * dims[2] < 4000
+
+
+def test_difference_on_grid():
+    dims = [3, 2, 2]
+    points = dims[0] * dims[1] * dims[2]
+    a = velocity_grid(np.tile([1.0, 0.0, 0.0], (points, 1)), np.ones(points), dims)
+    valid = np.ones(points)
+    valid[0] = 0
+    b = velocity_grid(np.tile([0.0, 3.0, 0.0], (points, 1)), valid, dims)
+    assert a.shape == (2, 2, 3, 3)
+
+    delta, speed = difference(a, b)
+    assert np.isnan(speed[0, 0, 0]) and np.isnan(delta[0, 0, 0]).all()
+    assert speed[1, 1, 2] == pytest.approx(2.0)
+    assert delta[1, 1, 2].tolist() == [-1.0, 3.0, 0.0]
+    assert symmetric_range(speed) == [-2.0, 2.0]
+
+    bounds = [-1, 1, -1, 1, 0, 2]
+    k = slice_index(1.6, bounds, dims)
+    assert k == 1
+    assert plane(b, k).shape == (6, 3)
+    assert plane(speed, k).shape == (6,)
+    assert plane(b, k).flags["C_CONTIGUOUS"]
@@ -0,0 +1,97 @@
+import asyncio
+import gc
+import io
+import logging
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from ventilation_simulator.app.download import QUEUE_CHUNKS, QueueWriter, case_files, stream_archive, write_archive
+
+
+@pytest.fixture
+def case_dir(tmp_path):
+    (tmp_path / "constant" / "polyMesh").mkdir(parents=True)
+    (tmp_path / "constant" / "polyMesh" / "points").write_bytes(b"x" * (3 << 20))
+    for time in ["0", "5"]:
+        (tmp_path / time).mkdir()
+        (tmp_path / time / "U").write_text("U")
+        (tmp_path / time / "p").write_text("p")
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "log.simpleFoam").write_text("Time = 1")
+    (tmp_path / "metadata.json").write_text("{}")
+    return str(tmp_path)
+
+
+def test_case_files(case_dir):
+    assert case_files(case_dir, fields={"U"}) == [
+        "constant/polyMesh/points", "5/U", "logs/log.simpleFoam", "metadata.json"
+    ]
+    assert case_files(case_dir, parts=["fields"]) == ["5/U", "5/p"]
+
+
+async def archive(fmt, case_dir):
+    # drain the queue like the download handler, tracking how many chunks wait in it
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+    writer = QueueWriter(loop, queue)
+    task = loop.run_in_executor(None, write_archive, fmt, case_dir, "case", case_files(case_dir), writer)
+    data = bytearray()
+    while True:
+        assert queue.qsize() <= QUEUE_CHUNKS
+        chunk = await queue.get()
+        if chunk is None:
+            break
+        data += chunk
+    await task
+    return io.BytesIO(bytes(data))
+
+
+def test_stream_zip(case_dir):
+    names = zipfile.ZipFile(asyncio.run(archive("zip", case_dir))).namelist()
+    assert "case/constant/polyMesh/points" in names
+    assert "case/5/U" in names and "case/0/U" not in names
+
+
+def test_stream_tar(case_dir):
+    names = tarfile.open(fileobj=asyncio.run(archive("tar", case_dir))).getnames()
+    assert "case/metadata.json" in names
+    assert "case/logs/log.simpleFoam" in names
+
+
+def test_aborted_download_leaves_no_unhandled_error(case_dir, monkeypatch):
+    # more than the socket buffers hold, the writer is still busy when the client leaves
+    with open(os.path.join(case_dir, "constant", "polyMesh", "points"), "wb") as fw:
+        fw.write(os.urandom(16 << 20))
+    # the record of the reset connection logged by aiohttp would keep the handler alive
+    monkeypatch.setattr(logging.getLogger("aiohttp.server"), "disabled", True)
+    errors = []
+
+    async def download(request):
+        return await stream_archive(request, "case", case_dir, "tar")
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        app = web.Application()
+        app.router.add_get("/download", download)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get("http://localhost:{0}/download".format(runner.addresses[0][1])) as response:
+                    await response.content.read(1024)
+            # let the handler see the disconnect and stop the writer
+            await asyncio.sleep(0.5)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+    gc.collect()
+    assert not [error for error in errors if "never retrieved" in error.get("message", "")]
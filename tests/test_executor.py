@@ -0,0 +1,80 @@
+import os
+import stat
+
+import pytest
+
+from ventilation_simulator.app.executor import (
+    BatchExecutor,
+    HostfileExecutor,
+    LocalExecutor,
+    create_executor,
+)
+
+
+def test_local_command():
+    executor = LocalExecutor()
+    assert executor.command(["blockMesh"]) == ["blockMesh"]
+    assert executor.command(["simpleFoam"], 4) == ["mpirun", "-np", "4", "simpleFoam", "-parallel"]
+
+
+def test_local_run(tmp_path):
+    log_path = str(tmp_path / "log.echo")
+    assert LocalExecutor().run(["sh", "-c", "echo hello"], str(tmp_path), log_path) == 0
+    assert open(log_path).read().strip() == "hello"
+    assert LocalExecutor().run(["sh", "-c", "exit 3"], str(tmp_path), log_path) == 3
+
+
+def test_hostfile_command(tmp_path):
+    hostfile = tmp_path / "hosts"
+    hostfile.write_text("localhost slots=2\n")
+    executor = create_executor("hostfile", hostfile=str(hostfile))
+    assert isinstance(executor, HostfileExecutor)
+    assert executor.command(["simpleFoam"], 2) == [
+        "mpirun", "--hostfile", str(hostfile), "-np", "2", "simpleFoam", "-parallel"
+    ]
+    with pytest.raises(FileNotFoundError):
+        HostfileExecutor(str(tmp_path / "missing"))
+
+
+def test_batch_run(tmp_path):
+    # stub scheduler: run the job script in the background and report a job id
+    stub = tmp_path / "sbatch"
+    stub.write_text('#!/bin/sh\nsh "$1" &\necho "Submitted batch job 42"\n')
+    stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+
+    executor = BatchExecutor(submit=str(stub), poll_interval=0.05, timeout=10, status="")
+    log_path = str(tmp_path / "log.echo")
+    assert executor.run(["sh", "-c", "echo batch"], str(tmp_path), log_path) == 0
+    assert open(log_path).read().strip() == "batch"
+    assert os.path.exists(log_path + ".sh")
+    assert "#SBATCH --output={0}.out\n".format(log_path) in open(log_path + ".sh").read()
+    assert executor.submit_job(log_path + ".sh", str(tmp_path)) == (0, "42")
+
+    assert executor.run(["sh", "-c", "exit 2"], str(tmp_path), log_path) == 2
+
+
+def stub_command(path, script):
+    path.write_text("#!/bin/sh\n" + script)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+@pytest.mark.parametrize("state", ["CANCELLED\n", ""])
+def test_batch_job_killed(tmp_path, state):
+    # the scheduler accepts the job but it never runs the script, so no marker is written
+    submit = stub_command(tmp_path / "sbatch", 'echo "Submitted batch job 7"\n')
+    status = stub_command(tmp_path / "squeue", 'printf "{0}"\n'.format(state))
+    executor = BatchExecutor(submit=submit, poll_interval=0.01, status=status)
+    assert executor.run(["true"], str(tmp_path), str(tmp_path / "log.true")) == -1
+
+
+def test_batch_timeout(tmp_path):
+    submit = stub_command(tmp_path / "sbatch", 'echo "Submitted batch job 7"\n')
+    status = stub_command(tmp_path / "squeue", 'echo RUNNING\n')
+    executor = create_executor("batch", submit=submit, poll_interval=0.01, timeout=0.2, status=status)
+    assert executor.run(["true"], str(tmp_path), str(tmp_path / "log.true")) == -1
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        create_executor("cloud")
@@ -0,0 +1,60 @@
+import os
+
+from ventilation_simulator.app.foam import parse_check_mesh, parse_iterations
+from ventilation_simulator.app.presets import OUTPUT_PROFILES, SAMPLES_DIR, SOLVER_PRESETS, fv_solution, \
+    sampling_functions, slice_heights, surface_name
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "..", "simulation", "system", "fvSolution")
+
+
+def test_balanced_preset_matches_template():
+    with open(TEMPLATE, "r", encoding="utf-8") as fr:
+        line = fr.readlines()
+    assert line[:15] + fv_solution("balanced") + line[92:] == line
+
+
+def test_presets_write_solvers_and_relaxation():
+    for preset in SOLVER_PRESETS:
+        text = "".join(fv_solution(preset))
+        assert text.count("{") == text.count("}")
+        assert "relaxationFactors" in text and "residualControl" in text
+
+
+def test_sampling_functions():
+    text = "".join(sampling_functions([1.0, 2.5], [(0, 0, 1.0), (0, 0, 2.0)], 3))
+    assert text.count("{") == text.count("}")
+    assert text.startswith("functions\n{\n    " + SAMPLES_DIR + "\n")
+    assert "        writeInterval   3;\n" in text
+    assert text.count("type        cuttingPlane;") == 2
+    assert "            {0}\n".format(surface_name(2.5)) in text and surface_name(2.5) == "z2_5"
+    assert "point   (0 0 2.5);" in text
+    assert "            (0 0 1.0)\n            (0 0 2.0)\n" in text
+    assert slice_heights(2) == [0.5, 1.0, 1.5] and slice_heights(0.4) == [0.2]
+
+
+def test_lean_profile_writes_compressed_ascii():
+    # OpenFOAM ignores the precision and the compression of binary output
+    lean = OUTPUT_PROFILES["lean"]
+    assert (lean["writeFormat"], lean["writeCompression"]) == ("ascii", "on")
+    assert lean["writePrecision"] < OUTPUT_PROFILES["full"]["writePrecision"]
+
+
+def test_parse_check_mesh(tmp_path):
+    log = tmp_path / "log.checkMesh"
+    log.write_text("Checking geometry...\n    Mesh non-orthogonality Max: 40 average: 5\n\nMesh OK.\n\nEnd\n")
+    assert parse_check_mesh(str(log)) == (True, [])
+
+    log.write_text(" ***Max skewness = 6.2, 3 highly skew faces detected\n\nFailed 1 mesh checks.\n\nEnd\n")
+    assert parse_check_mesh(str(log)) == (False, ["Max skewness = 6.2, 3 highly skew faces detected"])
+
+
+def test_parse_iterations(tmp_path):
+    log = tmp_path / "log.simpleFoam"
+    log.write_text("Time = 1\n\nsmoothSolver: Solving for Ux\nTime = 2\n\nTime = 3\n\nEnd\n")
+    assert parse_iterations(str(log)) == (3, False)
+
+    # the count reported on convergence wins over the counted time steps
+    log.write_text("Time = 1\n\nTime = 2\n\nSIMPLE solution converged in 41 iterations\n\nEnd\n")
+    assert parse_iterations(str(log)) == (41, True)
+
+    assert parse_iterations(str(tmp_path / "missing")) == (None, False)
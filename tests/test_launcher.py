@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from ventilation_simulator.app import launcher
+from ventilation_simulator.app.launcher import SessionClients, SessionPool
+
+
+class FakeWorker:
+    # the pipe of a worker process, the test plays the worker on the other end
+    instances = []
+
+    def __init__(self, port, argv):
+        self.port = port
+        self.conn, self.child = multiprocessing.Pipe()
+        self.started = launcher.time.monotonic()
+        self.status = "starting"
+        self.sessions = 0
+        self.routed = None
+        self.interactive = None
+        self.stopped = False
+        FakeWorker.instances.append(self)
+
+    def send(self, message):
+        self.child.send((message, self.port))
+
+    def stop(self):
+        self.stopped = True
+        self.conn.close()
+
+
+async def settle():
+    # let the event loop deliver the messages waiting in the pipes
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def pool():
+    FakeWorker.instances = []
+    return SessionPool(pool_size=1, max_workers=2, max_sessions=2, worker_class=FakeWorker)
+
+
+def test_sessions_are_routed_measured_and_recycled(pool):
+    async def scenario():
+        pool.fill()
+        first = FakeWorker.instances[0]
+        assert await pool.acquire(timeout=0.05) is None
+        first.send("ready")
+        await settle()
+        assert first.status == "idle"
+
+        assert await pool.acquire(timeout=1) is first
+        assert first.status == "routed"
+        # a routed worker is not idle, a second one is started to keep a spare
+        assert len(pool.workers) == 2
+        first.send("connected")
+        await settle()
+        assert first.status == "busy"
+        assert first.interactive is not None and first.interactive >= 0
+        assert pool.status()[str(first.port)]["time_to_interactive"] == first.interactive
+
+        for sessions in [1, 2]:
+            first.send("released")
+            await settle()
+            if sessions == 1:
+                assert first.status == "idle" and first.sessions == 1
+                assert await pool.acquire(timeout=1) is first
+                first.send("connected")
+        # recycled after max_sessions
+        assert first.stopped and first.port not in pool.workers
+
+    asyncio.run(scenario())
+
+
+def test_late_connection_keeps_the_worker(pool, monkeypatch):
+    monkeypatch.setattr(launcher, "CONNECT_TIMEOUT", 0)
+
+    async def scenario():
+        pool.fill()
+        worker = FakeWorker.instances[0]
+        worker.send("ready")
+        await settle()
+        assert await pool.acquire(timeout=1) is worker
+
+        # the browser connected but the message was not handled yet when the timeout is checked
+        worker.send("connected")
+        assert pool.idle_worker() is not worker
+        assert worker.status == "busy"
+
+        # a session that never connects gives its worker back
+        worker.send("released")
+        await settle()
+        assert await pool.acquire(timeout=1) is worker
+        assert pool.idle_worker() is worker
+
+    asyncio.run(scenario())
+
+
+def test_reset_when_the_last_client_leaves():
+    conn, child = multiprocessing.Pipe()
+    resets = []
+    clients = SessionClients(9000, child, lambda: resets.append(True))
+    clients.connected()
+    clients.connected()
+    clients.exited()
+    assert resets == []
+    clients.exited()
+    assert resets == [True]
+    assert conn.recv() == ("connected", 9000)
+    assert conn.recv() == ("released", 9000)
+    assert not conn.poll()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from ventilation_simulator.app.loadtest import IMAGE_TOPIC, STATE_TOPIC, Client, drive, percentile, summarize
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 51
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+async def fake_server(attachments):
+    # answers every call and pushes one image and the new state after each update
+    async def websocket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        pushes = 0
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.BINARY:
+                attachments.append(message.data)
+                continue
+            data = json.loads(message.data)
+            if "id" not in data:
+                continue
+            await ws.send_json({"wslink": "1.0", "id": data["id"], "result": {"viewId": "1"}})
+            if data["method"] == "trame.state.update":
+                pushes += 1
+                await ws.send_json({"wslink": "1.0", "method": "wslink.binary.attachment", "args": ["wslink_bin0"]})
+                await ws.send_bytes(b"\xff" * 1024)
+                await ws.send_json({"wslink": "1.0", "id": "publish:{0}:{1}".format(IMAGE_TOPIC, pushes),
+                                    "result": {"image": "wslink_bin0", "id": "1"}})
+                await ws.send_json({"wslink": "1.0", "id": "publish:{0}:{1}".format(STATE_TOPIC, pushes),
+                                    "result": data["args"][0]})
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", websocket)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    return runner, "ws://localhost:{0}/ws".format(runner.addresses[0][1])
+
+
+def test_clients_measure_latency_and_images():
+    async def scenario():
+        attachments = []
+        runner, url = await fake_server(attachments)
+        try:
+            async with aiohttp.ClientSession() as session:
+                clients = [Client(url, "c{0}".format(i)) for i in range(2)]
+                elapsed = await asyncio.gather(*(drive(session, client, 0.3, 0.01) for client in clients))
+
+                upload = Client(url, "upload")
+                await upload.connect(session)
+                await upload.call("trame.state.update", [{"key": "files", "value": "wslink_bin0"}],
+                                  attachments={"wslink_bin0": b"solid"})
+                await upload.wait_state("files", "wslink_bin0", timeout=5)
+                await upload.close()
+        finally:
+            await runner.cleanup()
+        return clients, max(elapsed), attachments
+
+    clients, elapsed, attachments = asyncio.run(scenario())
+    result = summarize(clients, elapsed)
+    assert result["clients"] == 2
+    assert 0 < sum(client.images for client in clients) <= result["updates"]
+    assert result["errors"] == 0
+    assert result["p50_ms"] <= result["p99_ms"]
+    assert result["mb_per_s"] == sum(client.binary_bytes for client in clients) / elapsed / 2 / 2 ** 20
+    assert "slicePos" in clients[0].state or "myLength" in clients[0].state
+    assert attachments == [b"solid"]
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+from ventilation_simulator.app.pipeline import Pipeline, Stage
+
+
+def test_independent_stages_run_concurrently(tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def independent(name):
+        barrier.wait()
+        order.append(name)
+
+    stages = [
+        Stage("a", lambda: independent("a")),
+        Stage("b", lambda: independent("b")),
+        Stage("c", lambda: order.append("c"), after=["a", "b"]),
+    ]
+    asyncio.run(Pipeline(str(tmp_path), stages).run())
+    assert sorted(order[:2]) == ["a", "b"]
+    assert order[2] == "c"
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    (tmp_path / "input").write_text("1")
+    calls = []
+
+    def produce():
+        calls.append("produce")
+        (tmp_path / "output").write_text("done")
+
+    def stages(value):
+        return [
+            Stage("produce", produce, inputs=["input"], outputs=["output"], params={"value": value}),
+            Stage("consume", lambda: calls.append("consume"), after=["produce"]),
+        ]
+
+    results = asyncio.run(Pipeline(str(tmp_path), stages(1)).run())
+    assert calls == ["produce", "consume"]
+    assert results["produce"] is not None
+
+    results = asyncio.run(Pipeline(str(tmp_path), stages(1)).run())
+    assert calls == ["produce", "consume"]
+    assert results == {"produce": None, "consume": None}
+
+    # changed input content, parameters or missing outputs rerun the stage and its dependents
+    (tmp_path / "input").write_text("2")
+    asyncio.run(Pipeline(str(tmp_path), stages(1)).run())
+    asyncio.run(Pipeline(str(tmp_path), stages(2)).run())
+    (tmp_path / "output").unlink()
+    asyncio.run(Pipeline(str(tmp_path), stages(2)).run())
+    assert calls == ["produce", "consume"] * 4
+
+
+def test_failed_stage_is_not_recorded(tmp_path):
+    calls = []
+
+    def fail():
+        calls.append("fail")
+        time.sleep(0.01)
+        raise RuntimeError("boom")
+
+    stages = [Stage("fail", fail), Stage("after", lambda: calls.append("after"), after=["fail"])]
+    for _ in range(2):
+        try:
+            asyncio.run(Pipeline(str(tmp_path), stages).run())
+        except RuntimeError:
+            pass
+    assert calls == ["fail", "fail"]
@@ -0,0 +1,43 @@
+from ventilation_simulator.app.registry import CaseRegistry
+
+
+def test_registry_persists_cases(tmp_path):
+    path = str(tmp_path / "cases.db")
+    registry = CaseRegistry(path)
+    registry.create("a", str(tmp_path / "a"), inputs={"files": ["house.stl"]})
+    registry.update("a", status="completed", metrics={"iterations": 120}, artifacts={"fields": "120"})
+    registry.close()
+
+    registry = CaseRegistry(path)
+    case = registry.get("a")
+    assert case["status"] == "completed"
+    assert case["inputs"] == {"files": ["house.stl"]}
+    assert case["metrics"] == {"iterations": 120}
+    assert registry.get("missing") is None
+
+
+def test_registry_pagination(tmp_path):
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    for i in range(25):
+        registry.create(str(i), str(tmp_path / str(i)))
+        registry.update(str(i), status="completed" if i % 2 else "failed")
+
+    assert registry.count() == 25
+    assert registry.count(status="completed") == 12
+    first = registry.list(status="completed", limit=5)
+    second = registry.list(status="completed", offset=5, limit=5)
+    assert [case["id"] for case in first] == ["23", "21", "19", "17", "15"]
+    assert [case["id"] for case in second] == ["13", "11", "9", "7", "5"]
+
+
+def test_registry_fails_active_cases(tmp_path):
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    for status in ["created", "queued", "meshing", "meshed", "running", "completed"]:
+        registry.create(status, str(tmp_path / status), status=status)
+
+    assert registry.fail_active("restarted") == 3
+    assert [case["id"] for case in registry.list(status="failed")] == ["running", "meshing", "queued"]
+    assert registry.get("running")["metrics"] == {"error": "restarted"}
+    registry.delete("created")
+    assert registry.get("created") is None
+    assert registry.count() == 5
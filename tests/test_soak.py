@@ -0,0 +1,136 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("paraview.simple")
+pytest.importorskip("trame.widgets.paraview")
+
+from ventilation_simulator.app import stubs
+from ventilation_simulator.app.proxies import live_proxies, rss_bytes
+from ventilation_simulator.app.stubs import ROOT, StubExecutor
+
+RUNS = 8
+RSS_SLACK = 32 * 2 ** 20
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    bin_dir = stubs.install(str(tmp_path / "bin"))
+    monkeypatch.setenv("PATH", "{0}{1}{2}".format(bin_dir, os.pathsep, os.environ["PATH"]))
+    monkeypatch.setattr(sys, "argv", ["ventilation-simulator", "--data-dir", str(tmp_path / "data")])
+    monkeypatch.chdir(ROOT)
+
+    from trame.app import get_server
+    from ventilation_simulator.app.core import create_engine
+
+    engine = create_engine(get_server("soak"))
+    engine.executor = engine.case.executor = StubExecutor()
+    engine.case.inlet = "(0 1 5 4)"
+    engine.case.outlet = "(3 7 6 2)"
+    engine.case.windDirection = "(0 -1 0)"
+    engine.case.aeroRoughness = "0.0002"
+    yield engine
+    engine.release_results()
+    engine.registry.close()
+
+
+def run_once(engine):
+    engine.state.update({"setProgress": 0, "simProgress": 0, "postProcessing": True})
+    engine.read([{"name": "box.stl", "content": stubs.STL}])
+
+    engine.writable_case()
+    engine.case.removeHistory()
+    asyncio.run(engine.case.run_set())
+    engine.view_environment()
+    engine.setSuccess = True
+
+    engine.writable_case()
+    engine.case.clear_results()
+    asyncio.run(engine.case.run_simulation())
+    engine.view_foam()
+    engine.render_thumbnails()
+    engine.state.postProcessing = False
+
+
+def test_repeated_runs_keep_memory_flat(engine):
+    # warm up caches and lazily created proxies before taking the baseline
+    for _ in range(2):
+        run_once(engine)
+    proxies = live_proxies()
+    tracked = engine.proxies.counts()
+    rss = rss_bytes()
+
+    for _ in range(RUNS):
+        run_once(engine)
+
+    assert live_proxies() == proxies
+    assert engine.proxies.counts() == tracked
+    if rss is not None:
+        assert rss_bytes() - rss < RSS_SLACK
+
+
+def test_new_result_invalidates_slices(engine):
+    run_once(engine)
+    engine.state.slicePos = 2.0
+    engine.update_slice()
+    assert len(engine.slice_cache) == 2
+
+    # slices of the replaced result are dropped, only the one on screen is extracted again
+    run_once(engine)
+    assert len(engine.slice_cache) == 1
+
+
+def test_failed_thumbnails_release_their_proxies(engine, monkeypatch):
+    from paraview import simple
+
+    run_once(engine)
+    proxies = live_proxies()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("no OpenGL")
+
+    monkeypatch.setattr(simple, "SaveScreenshot", fail)
+    engine.render_thumbnails()
+    assert live_proxies() == proxies
+    assert "thumbnail" not in engine.proxies.counts()
+    assert not any(simple.GetDisplayProperties(reader, engine.thumbnail_view).Visibility \
+                   for reader in engine.stl_readers.values())
+
+
+def test_set_after_reset(engine):
+    run_once(engine)
+    case_id = engine.case.case_id
+    engine.reset()
+    assert engine.case.case_id != case_id
+    assert engine.case.files == []
+    assert engine.case.inlet == "(0 1 5 4)" and engine.case.outlet == "(3 7 6 2)"
+
+    # a session leaving its case unused hands it on to the next one
+    engine.read([{"name": "box.stl", "content": stubs.STL}])
+    engine.reset()
+    assert engine.case.case_id != case_id and engine.case.files == []
+    assert engine.registry.count(status="created") == 1
+
+    # the next session of a pooled worker sets and simulates with the selections it was left with
+    run_once(engine)
+    assert engine.case.status == "completed"
+
+
+def test_compare_views_created_on_first_comparison(engine):
+    assert engine.compare_views == []
+    engine.update_compare_views()
+
+    run_once(engine)
+    first = engine.case.case_id
+    run_once(engine)
+    engine.state.update({"compareA": first, "compareB": engine.case.case_id})
+    engine.compare()
+    assert len(engine.compare_views) == 3
+    assert len(engine.compare_updates) == 3
+
+    views = list(engine.compare_views)
+    engine.close_compare()
+    engine.compare()
+    assert engine.compare_views == views
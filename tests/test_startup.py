@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Seconds each entry point may take on top of a bare interpreter start
+BUDGETS = {
+    "import ventilation_simulator.app": 0.5,
+    "from ventilation_simulator.app.jupyter import jupyter_proxy_info; jupyter_proxy_info()": 0.5,
+    "import ventilation_simulator.app.registry, ventilation_simulator.app.executor": 0.5,
+    "import ventilation_simulator.app.launcher": 1.0,
+}
+HELP_BUDGET = 2.0
+
+HEAVY_MODULES = ["paraview", "vtkmodules", "trame.widgets"]
+
+
+def run_python(*args):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True)
+    return time.perf_counter() - start, process
+
+
+def imported_modules(stderr):
+    # -X importtime lines look like "import time: self | cumulative | module"
+    return [line.rsplit("|", 1)[-1].strip() for line in stderr.splitlines() if line.startswith("import time:")]
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return min(run_python("-c", "pass")[0] for _ in range(3))
+
+
+@pytest.mark.parametrize("statement", list(BUDGETS))
+def test_entry_point_budget(statement, baseline):
+    elapsed, process = run_python("-c", statement)
+    assert process.returncode == 0, process.stderr
+    modules = imported_modules(process.stderr)
+    for heavy in HEAVY_MODULES:
+        assert not any(module.startswith(heavy) for module in modules), heavy
+    assert elapsed - baseline < BUDGETS[statement]
+
+
+def test_help_budget(baseline):
+    elapsed, process = run_python("-m", "ventilation_simulator.app.main", "--help")
+    assert process.returncode == 0, process.stderr
+    assert "--executor" in process.stdout
+    modules = imported_modules(process.stderr)
+    assert not any(module.startswith("paraview") for module in modules)
+    assert elapsed - baseline < HELP_BUDGET
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("vtkmodules.vtkFiltersFlowPaths")
+from vtkmodules.vtkCommonCore import vtkFloatArray
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import vtkAppendFilter
+
+from ventilation_simulator.app.streamlines import MAX_SEEDS, MAX_STEPS, StreamlineTracer
+
+
+def uniform_flow(size=4, velocity=(1.0, 0.0, 0.0)):
+    # a box of hexahedra with the same velocity at every point, as an unstructured grid
+    image = vtkImageData()
+    image.SetDimensions(size + 1, size + 1, size + 1)
+    image.SetOrigin(-size / 2, -size / 2, 0)
+    field = vtkFloatArray()
+    field.SetName("U")
+    field.SetNumberOfComponents(3)
+    for _ in range(image.GetNumberOfPoints()):
+        field.InsertNextTuple3(*velocity)
+    image.GetPointData().AddArray(field)
+    append = vtkAppendFilter()
+    append.AddInputData(image)
+    append.Update()
+    return append.GetOutput()
+
+
+def test_seeds_and_steps_are_bounded():
+    tracer = StreamlineTracer(uniform_flow())
+    assert tracer.seeds("point", [0, 0, 1], 10 * MAX_SEEDS, 1).GetNumberOfPoints() == MAX_SEEDS
+    assert tracer.seeds("line", [0, 0, 1], 10 * MAX_SEEDS, 1).GetNumberOfPoints() == MAX_SEEDS
+    assert tracer.seeds("line", [0, 0, 1], 0, 1).GetNumberOfPoints() == 2
+
+    lines = tracer.trace("line", [0, 0, 1], 5, 1, steps=10 * MAX_STEPS)
+    assert tracer.tracer.GetMaximumNumberOfSteps() == MAX_STEPS
+    assert lines.GetNumberOfCells() > 0
+    tracer.trace("line", [0, 0, 1], 5, 1, steps=0)
+    assert tracer.tracer.GetMaximumNumberOfSteps() == 1
+
+
+def test_locator_is_built_once_per_dataset():
+    grid = uniform_flow()
+    tracer = StreamlineTracer(grid)
+    locator = tracer.locator
+    built = locator.GetMTime()
+
+    first = tracer.trace("point", [0, 0, 1], 10, 1)
+    second = tracer.trace("line", [0.5, 0.5, 2], 20, 2)
+    assert tracer.locator is locator and locator.GetMTime() == built
+    assert locator.GetDataSet() is tracer.grid
+    assert first.GetNumberOfPoints() > 0 and second.GetNumberOfPoints() > 0
+    # every trace returns its own copy
+    assert first is not second
+
+    # another time step or result is another dataset with a locator of its own
+    other = StreamlineTracer(uniform_flow(velocity=(0.0, 1.0, 0.0)))
+    assert other.locator is not locator
+    assert other.locator.GetDataSet() is other.grid is not tracer.grid
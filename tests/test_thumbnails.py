@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from ventilation_simulator.app.case import Case
+from ventilation_simulator.app.registry import CaseRegistry
+from ventilation_simulator.app.thumbnails import THUMBNAIL_DIR, add_routes, thumbnail_urls
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def test_thumbnail_routes(tmp_path):
+    registry = CaseRegistry(str(tmp_path / "cases.db"))
+    case = Case(registry, None, "abc", str(tmp_path / "abc"))
+    registry.create(case.case_id, case.case_dir)
+    (tmp_path / "abc" / THUMBNAIL_DIR).mkdir(parents=True)
+    assert thumbnail_urls(registry.get("abc")) is None
+
+    (tmp_path / "abc" / THUMBNAIL_DIR / "slice.png").write_bytes(PNG)
+    case.update("completed", artifacts=case.artifacts())
+    urls = thumbnail_urls(registry.get("abc"))
+    assert urls == {"slice": "thumbnails/abc/slice.png"}
+
+    async def scenario():
+        app = web.Application()
+        add_routes(app, registry)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        url = "http://localhost:{0}/".format(runner.addresses[0][1])
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url + urls["slice"]) as response:
+                    assert response.status == 200
+                    assert "immutable" in response.headers["Cache-Control"]
+                    body = await response.read()
+                async with session.get(url + "thumbnails/abc/overview.png") as response:
+                    assert response.status == 404
+        finally:
+            await runner.cleanup()
+        return body
+
+    assert asyncio.run(scenario()) == PNG
+    registry.close()
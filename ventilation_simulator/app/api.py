@@ -0,0 +1,164 @@
+"""
+HTTP/JSON API running cases without a browser
+
+Jobs are cases of the registry run by the same set and simulation pipelines
+as the application, without an engine or a render view of their own. Up to
+``max_jobs`` of them run at once next to the sessions, the others wait queued.
+
+    POST /api/jobs                 multipart: STL parts named "files" and a JSON part named "params"
+    GET  /api/jobs/<id>            status, inputs, metrics and artifacts of a job
+    GET  /api/jobs/<id>/results    archive of a completed job, same query as /download/<id>
+"""
+import os
+import json
+import asyncio
+import logging
+
+from aiohttp import web
+
+from .case import Case, DEFAULT_INPUTS, PATCH_FACES, ROUGHNESS
+from .download import archive_options, stream_archive
+from .presets import OUTPUT_PROFILES, SOLVER_PRESETS
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Patches by name, in the order of PATCH_FACES, and the wind blowing in from each of them
+PATCHES = ["front", "back", "left", "right"]
+WIND_DIRECTIONS = ["(0 -1 0)", "(0 1 0)", "(-1 0 0)", "(1 0 0)"]
+
+POSITIVE = ["length", "width", "height", "windSpeed", "windHeight", "simTime", "snapshots"]
+
+# Parameters a job falls back to where the application has no default selection
+JOB_DEFAULTS = {"inlet": "front", "outlet": "back", "aeroRoughness": ROUGHNESS[0]}
+
+
+def job_inputs(params):
+    """Return the case inputs of the parameters of a job, raise ValueError on invalid ones"""
+    params = dict(JOB_DEFAULTS, **params)
+    unknown = sorted(set(params) - set(DEFAULT_INPUTS) | set(params) & {"files", "windDirection"})
+    if unknown:
+        raise ValueError("Unknown parameters: {0}".format(", ".join(unknown)))
+    inputs = dict(DEFAULT_INPUTS, **params)
+
+    for name in POSITIVE:
+        value = inputs[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError("{0} must be a positive number".format(name))
+    if not isinstance(inputs["snapshots"], int):
+        raise ValueError("snapshots must be an integer")
+    if not isinstance(inputs["potentialInit"], bool):
+        raise ValueError("potentialInit must be true or false")
+    for name, choices in [("inlet", PATCHES), ("outlet", PATCHES), ("aeroRoughness", ROUGHNESS), \
+                          ("outputProfile", OUTPUT_PROFILES), ("solverPreset", SOLVER_PRESETS)]:
+        if inputs[name] not in choices:
+            raise ValueError("{0} must be one of {1}".format(name, ", ".join(choices)))
+    if inputs["inlet"] == inputs["outlet"]:
+        raise ValueError("inlet and outlet must be different patches")
+
+    # the block and the boundary conditions take faces and a direction instead of patch names
+    inputs["windDirection"] = WIND_DIRECTIONS[PATCHES.index(inputs["inlet"])]
+    inputs["inlet"] = PATCH_FACES[PATCHES.index(inputs["inlet"])]
+    inputs["outlet"] = PATCH_FACES[PATCHES.index(inputs["outlet"])]
+    return inputs
+
+
+class JobRunner:
+    def __init__(self, registry, executor, data_dir, max_jobs=2):
+        self.registry = registry
+        self.executor = executor
+        self.data_dir = data_dir
+        self.max_jobs = max_jobs
+        self.slots = None
+        self.tasks = dict()
+
+    def submit(self, uploads, inputs):
+        # a new case from the template with the uploaded STLs, queued until a slot is free
+        case = Case.create(self.registry, self.executor, self.data_dir, inputs=inputs)
+        save_path = os.path.join(case.case_dir, 'constant', 'triSurface')
+        os.makedirs(save_path, exist_ok=True)
+        for name, content in uploads:
+            with open(os.path.join(save_path, name), "wb") as fw:
+                fw.write(content)
+        case.files = [name for name, _ in uploads]
+        case.update("queued")
+        self.tasks[case.case_id] = asyncio.create_task(self.run(case))
+        return case
+
+    async def run(self, case):
+        # the semaphore belongs to the event loop of the server, create it there
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_jobs)
+        try:
+            async with self.slots:
+                case.update("meshing")
+                case.removeHistory()
+                await case.run_set()
+                case.update("running")
+                case.clear_results()
+                await case.run_simulation()
+            logger.info("Job %s completed", case.case_id)
+        except Exception as error:
+            logger.error("Job %s failed: %s", case.case_id, error)
+            case.update("failed", metrics={"error": str(error)})
+        finally:
+            self.tasks.pop(case.case_id, None)
+
+
+def job_record(case):
+    return {name: case[name] for name in ["id", "status", "created", "updated", "parent", "inputs", "metrics", \
+                                          "artifacts"]}
+
+
+def add_routes(app, jobs):
+    async def submit(request):
+        if not request.content_type.startswith("multipart/"):
+            raise web.HTTPBadRequest(text="Send the STLs and parameters as multipart/form-data")
+        uploads = []
+        params = {}
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "files":
+                name = os.path.basename(part.filename or "")
+                if not name.lower().endswith(".stl"):
+                    raise web.HTTPBadRequest(text="Only STL files are accepted, got {0!r}".format(name))
+                uploads.append((name, await part.read()))
+            elif part.name == "params":
+                try:
+                    params = json.loads(await part.text())
+                except ValueError as error:
+                    raise web.HTTPBadRequest(text="params is not valid JSON: {0}".format(error))
+        if not uploads:
+            raise web.HTTPBadRequest(text="Upload at least one STL file as files")
+        if len({name.split('.')[0] for name, _ in uploads}) != len(uploads):
+            raise web.HTTPBadRequest(text="STL files need distinct names")
+        if not isinstance(params, dict):
+            raise web.HTTPBadRequest(text="params must be a JSON object")
+        try:
+            inputs = job_inputs(params)
+        except ValueError as error:
+            raise web.HTTPBadRequest(text=str(error))
+
+        case = jobs.submit(uploads, inputs)
+        return web.json_response({"id": case.case_id, "status": case.status}, status=202)
+
+    def get_job(request):
+        case_id = request.match_info["job_id"]
+        case = jobs.registry.get(case_id)
+        if case is None:
+            raise web.HTTPNotFound(text="Unknown job {0}".format(case_id))
+        return case
+
+    async def status(request):
+        return web.json_response(job_record(get_job(request)))
+
+    async def results(request):
+        case = get_job(request)
+        if case["status"] != "completed":
+            raise web.HTTPConflict(text="Job {0} is {1}".format(case["id"], case["status"]))
+        return await stream_archive(request, case["id"], case["case_dir"], *archive_options(request))
+
+    app.router.add_post("/api/jobs", submit)
+    app.router.add_get("/api/jobs/{job_id}", status)
+    app.router.add_get("/api/jobs/{job_id}/results", results)
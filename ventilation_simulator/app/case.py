@@ -0,0 +1,597 @@
+"""
+A simulation case: its workspace, its inputs and the pipelines run on it
+
+The case writes the OpenFOAM dictionaries from the templates, runs the
+commands through an executor and keeps its row of the registry up to date.
+It knows nothing about the user interface or ParaView, so the application and
+the job API run cases the same way.
+"""
+import os
+import json
+import math
+import time
+import uuid
+import shutil
+import logging
+
+from .foam import latest_time, parse_check_mesh, parse_iterations
+from .pipeline import Pipeline, Stage, STAMP_FILE, read_stamps
+from .presets import OUTPUT_PROFILES, PROBE_HEIGHTS, fv_solution, sampling_functions, slice_heights
+from .registry import CaseRegistry, REGISTRY_FILE
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Number of MPI ranks, must match numberOfSubdomains in decomposeParDict
+NPROCS = 12
+
+TEMPLATE_DIR = './simulation'
+
+# Values of the patch and landscape selections, in the order of Engine.Patch and Engine.Landscape
+PATCH_FACES = ["(0 1 5 4)", "(3 7 6 2)", "(0 4 7 3)", "(1 2 6 5)"]
+ROUGHNESS = ["0.0002", "0.005", "0.03", "0.10", "0.25", "0.5", "1.0", "2.0"]
+
+# Inputs of a new case, also the parameters accepted by the job API
+DEFAULT_INPUTS = {
+    "files": [],
+    "length": 5,
+    "width": 5,
+    "height": 5,
+    "inlet": "",
+    "outlet": "",
+    "windSpeed": 5,
+    "windHeight": 5,
+    "windDirection": "",
+    "aeroRoughness": "",
+    "simTime": 5,
+    "snapshots": 1,
+    "outputProfile": "full",
+    "potentialInit": True,
+    "solverPreset": "balanced",
+}
+
+
+class Case:
+    def __init__(self, registry, executor, case_id, case_dir, status="created", inputs=None, metadata=None):
+        self.registry = registry
+        self.executor = executor
+        self.case_id = case_id
+        self.case_dir = case_dir
+        self.status = status
+        for name, value in dict(DEFAULT_INPUTS, **(inputs or {})).items():
+            setattr(self, name, list(value) if isinstance(value, list) else value)
+        self.metadata = metadata or {"runs": [], "iterations": {}}
+
+    @classmethod
+    def create(cls, registry, executor, data_dir, source=TEMPLATE_DIR, parent=None, inputs=None):
+        # copy a template (or a previous case) into a new persistent workspace
+        case_id = uuid.uuid4().hex
+        case_dir = os.path.join(data_dir, 'cases', case_id)
+        keep = ['0', 'constant', 'system', 'metadata.json', STAMP_FILE]
+        ignore = lambda path, names: [] if os.path.normpath(path) != os.path.normpath(source) \
+            else [name for name in names if name not in keep]
+        shutil.copytree(source, case_dir, ignore=ignore, dirs_exist_ok=True)
+        case = cls(registry, executor, case_id, case_dir, inputs=inputs, metadata=read_metadata(case_dir))
+        registry.create(case_id, case_dir, parent=parent, inputs=case.inputs())
+        return case
+
+    @classmethod
+    def open(cls, registry, executor, case_id):
+        record = registry.get(case_id)
+        if record is None or not os.path.isdir(record["case_dir"]):
+            return None
+        return cls(registry, executor, case_id, record["case_dir"], record["status"], record["inputs"], \
+                   read_metadata(record["case_dir"]))
+
+    def fork(self):
+        # completed cases are kept as they are, further changes go to a copy of them
+        case = Case.create(self.registry, self.executor, os.path.dirname(os.path.dirname(self.case_dir)), \
+                           source=self.case_dir, parent=self.case_id, inputs=self.inputs())
+        # the mesh is copied, so is its check, a rerun with other parameters does not check it again
+        check_log = os.path.join(self.case_dir, 'logs', 'log.checkMesh')
+        if os.path.exists(check_log):
+            os.makedirs(os.path.join(case.case_dir, 'logs'), exist_ok=True)
+            shutil.copy2(check_log, os.path.join(case.case_dir, 'logs', 'log.checkMesh'))
+        return case
+
+    def discard(self):
+        # drop the workspace and the row of a case nothing was run on
+        shutil.rmtree(self.case_dir, ignore_errors=True)
+        self.registry.delete(self.case_id)
+
+    def clear_uploads(self):
+        save_path = os.path.join(self.case_dir, 'constant', 'triSurface')
+        if os.path.isdir(save_path):
+            for name in os.listdir(save_path):
+                os.remove(os.path.join(save_path, name))
+        self.files = []
+
+    @property
+    def foam_path(self):
+        # paraFoam -touch names the file after the case directory
+        return os.path.join(self.case_dir, os.path.basename(os.path.normpath(self.case_dir)) + ".foam")
+
+    def inputs(self):
+        return {name: getattr(self, name) for name in DEFAULT_INPUTS}
+
+    def update(self, status, **kwargs):
+        self.status = status
+        self.registry.update(self.case_id, status=status, inputs=self.inputs(), **kwargs)
+
+    def artifacts(self):
+        artifacts = {
+            "mesh": os.path.join('constant', 'polyMesh'),
+            "fields": latest_time(self.case_dir),
+            "logs": "logs",
+            "metadata": "metadata.json",
+        }
+        # images rendered by the application once the run is completed
+        thumbnails = os.path.join(self.case_dir, 'thumbnails')
+        if os.path.isdir(thumbnails):
+            artifacts["thumbnails"] = {name.split('.')[0]: os.path.join('thumbnails', name) \
+                                       for name in sorted(os.listdir(thumbnails))}
+        return artifacts
+
+    async def run_set(self, on_stage_done=None):
+        try:
+            await self.set_pipeline().run(on_stage_done)
+        except Exception:
+            self.update("failed")
+            raise
+        self.update("meshed", artifacts={"mesh": os.path.join('constant', 'polyMesh')})
+
+    async def run_simulation(self, on_stage_done=None):
+        try:
+            timings = await self.simulate_pipeline().run(on_stage_done)
+        except Exception:
+            self.update("failed")
+            raise
+        timings.pop('configure', None)
+        self.record_run(timings)
+        self.update("completed", metrics=self.metadata["runs"][-1], artifacts=self.artifacts())
+
+    def removeHistory(self, keep_logs=()):
+        #os.remove(os.path.join(self.case_dir, '{0}.foam'.format(self.case_dir.split('/')[1])))
+        orig = ['0', 'constant', 'system', os.path.basename(self.foam_path), 'metadata.json', STAMP_FILE]
+        for dir in os.listdir(self.case_dir):
+            if dir == 'logs' and keep_logs:
+                for log in os.listdir(os.path.join(self.case_dir, dir)):
+                    if log not in keep_logs:
+                        os.remove(os.path.join(self.case_dir, dir, log))
+            elif dir not in orig:
+                path = os.path.join(self.case_dir, dir)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+
+    def run_command(self, cmd, name, nprocs=None):
+        # run an OpenFOAM command through the executor, keep its output in logs/log.<name> and time it
+        log_dir = os.path.join(self.case_dir, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        start = time.perf_counter()
+        returncode = self.executor.run(cmd, self.case_dir, os.path.join(log_dir, 'log.{0}'.format(name)), nprocs)
+        elapsed = time.perf_counter() - start
+        if returncode != 0:
+            raise RuntimeError("{0} exited with code {1}, see logs/log.{0}".format(name, returncode))
+        return elapsed
+
+    def convert(self, file, **kwargs):
+        # extract the features of one STL with its own dictionary so that STLs are processed concurrently
+        stem = file.split('.')[0]
+        conversion_template = os.path.join('simulation', 'system', 'surfaceFeaturesDict')
+        conversion_path = os.path.join(self.case_dir, 'system', 'surfaceFeaturesDict.{0}'.format(stem))
+        with open(conversion_template, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+
+        line_ = line[16:]
+        del line[16:]
+
+        line.append("\"{0}\"\n".format(file))
+        
+        line += line_
+
+        with open(conversion_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+
+        self.run_command(['surfaceFeatures', '-dict', os.path.join('system', 'surfaceFeaturesDict.{0}'.format(stem))], \
+                         'surfaceFeatures.{0}'.format(stem))
+
+    def block(self, **kwargs):
+        # Modify blockMesh
+        x = self.length
+        y = self.width
+        z = self.height
+        vertices = [(-x, -y, 0), (x, -y, 0), (x, y, 0), (-x, y, 0), \
+                    (-x, -y, z), (x, -y, z), (x, y, z), (-x, y, z)]
+
+        block_template = os.path.join('simulation', 'system', 'blockMeshDict')
+        block_path = os.path.join(self.case_dir, 'system', 'blockMeshDict')
+
+        with open(block_template, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+
+        i = 19
+        while i < 25:
+            for v in vertices:
+                line[i] = "    (" + str(v[0]) + " " + str(v[1]) + " " + str(v[2]) + ")\n"
+                i+=1
+        
+        line[46] = "            " + self.inlet + "\n"
+        line[63] = "            " + self.outlet + "\n" 
+
+        patches_val = ["(0 1 5 4)", "(3 7 6 2)", "(0 4 7 3)", "(1 2 6 5)"]
+        patches_val.remove(self.inlet)
+        patches_val.remove(self.outlet)
+
+        line[54] = "            " + patches_val[0] + "\n"
+        line[55] = "            " + patches_val[1] + "\n"
+
+        with open(block_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+        
+        # Modify Coefficients
+        coeffs = ["epsilon", "k", "nut", "p", "U"]
+        for coeff in coeffs:
+            coeff_template = os.path.join('simulation', '0', coeff)
+            with open(coeff_template, "r", encoding="utf-8") as fr:
+                line = fr.readlines()
+            for file in self.files:
+                content = self.coeffContent(coeff, file)
+                coeff_path = os.path.join(self.case_dir, '0', coeff)
+        
+                for i in content:
+                    line.append(i)
+
+                with open(coeff_path, "w", encoding="utf-8") as fw:
+                    if file == self.files[-1]:
+                        line.append("}\n")
+                    fw.writelines(line)
+
+
+        self.run_command(['blockMesh'], 'blockMesh')
+
+    def coeffContent(self, coeff, file):
+        epsilon = ["    {0}\n".format(file.split('.')[0]), \
+                "    {\n", "        type            epsilonWallFunction;\n", \
+                "        Cmu             0.09;\n", "        kappa           0.4;\n", \
+                "        E               9.8;\n", "        value           $internalField;\n", \
+                "    }\n", "\n"]
+        
+        k = ["    {0}\n".format(file.split('.')[0]), \
+            "    {\n", "        type            kqRWallFunction;\n", \
+            "        value           uniform 0.0;\n", \
+            "    }\n", "\n"]
+        
+        nut = ["    {0}\n".format(file.split('.')[0]), \
+            "    {\n", "        type            nutkAtmRoughWallFunction;\n", \
+            "        z0              $z0;\n", "        value           uniform 0.0;\n", \
+            "    }\n", "\n"]
+
+        p = ["    {0}\n".format(file.split('.')[0]), \
+            "    {\n", "        type            zeroGradient;\n", \
+            "    }\n", "\n"]
+        
+        U = ["    {0}\n".format(file.split('.')[0]), \
+            "    {\n", "        type            noSlip;\n", \
+            "    }\n", "\n"]
+        
+
+        if coeff == "epsilon":
+            return epsilon
+        elif coeff == "k":
+            return k
+        elif coeff == "nut":
+            return nut
+        elif coeff == "p":
+            return p
+        elif coeff == "U":
+            return U
+
+    def mesh(self, **kwargs):
+        mesh_template = os.path.join('simulation', 'system', 'snappyHexMeshDict')
+        mesh_path = os.path.join(self.case_dir, 'system', 'snappyHexMeshDict')
+
+        with open(mesh_template, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+        
+        a = line[30:81]
+        b = line[81:96]
+        c = line[96:]
+        del line[30:]
+        toModify = ["geometry", "features", "surfaces"]
+
+        for part in toModify:
+            for file in self.files:
+                content = self.snappyContent(file, part)
+                line += content
+            if part == toModify[0]:
+                line += a
+            elif part == toModify[1]:
+                line += b
+            else:
+                line += c
+        
+        with open(mesh_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+        
+        # modify decomposeParDict
+        decompose_path = os.path.join(self.case_dir, 'system', 'decomposeParDict.orig')
+        with open(decompose_path, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+        
+        line[18] = "method          hierarchical;\n"
+
+        with open(decompose_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+
+        self.run_command(['decomposePar', '-force'], 'decomposePar')
+        self.run_command(['snappyHexMesh', '-overwrite'], 'snappyHexMesh', NPROCS)
+        self.run_command(['reconstructParMesh', '-constant'], 'reconstructParMesh')
+
+    def snappyContent(self, file, toModify):
+        geometry = ["    {0}\n".format(file.split('.')[0]), \
+                    "    {\n", "        type triSurfaceMesh;\n", \
+                    "        file \"{0}\";\n".format(file), \
+                    "    }\n", "\n"]
+
+        features = ["        {\n", "            file \"{0}.{1}\";\n".format(file.split('.')[0], "eMesh"), \
+                    "            level 2;\n", "        }\n"]
+
+        surfaces = ["        {0}\n".format(file.split('.')[0]), \
+                    "        {\n", "            level (2 2);\n", \
+                    "        }\n", "\n"]
+        
+        if toModify == "geometry":
+            return geometry
+        elif toModify == "features":
+            return features
+        elif toModify == "surfaces":
+            return surfaces
+
+    def set_pipeline(self):
+        # surfaceFeatures of every STL and blockMesh are independent, snappyHexMesh needs them all.
+        # blockMesh also depends on the STLs since snappyHexMesh overwrites its mesh in place.
+        surfaces = [os.path.join('constant', 'triSurface', file) for file in self.files]
+        stages = []
+        for file in self.files:
+            stem = file.split('.')[0]
+            stages.append(Stage(
+                'features.{0}'.format(stem),
+                lambda file=file: self.convert(file),
+                inputs=[os.path.abspath(os.path.join('simulation', 'system', 'surfaceFeaturesDict')), \
+                        os.path.join('constant', 'triSurface', file)],
+                outputs=[os.path.join('constant', 'triSurface', '{0}.eMesh'.format(stem))],
+                progress=2 / len(self.files),
+            ))
+        stages.append(Stage(
+            'block',
+            self.block,
+            inputs=[os.path.abspath(os.path.join('simulation', 'system', 'blockMeshDict')), \
+                    os.path.abspath(os.path.join('simulation', '0'))] + surfaces,
+            outputs=[os.path.join('constant', 'polyMesh')],
+            params={"length": self.length, "width": self.width, "height": self.height, \
+                    "inlet": self.inlet, "outlet": self.outlet, "files": self.files},
+            progress=15,
+        ))
+        stages.append(Stage(
+            'mesh',
+            self.mesh,
+            inputs=[os.path.abspath(os.path.join('simulation', 'system', 'snappyHexMeshDict'))],
+            outputs=[os.path.join('constant', 'polyMesh')],
+            after=[stage.name for stage in stages],
+            params={"files": self.files},
+            progress=78,
+        ))
+        return Pipeline(self.case_dir, stages)
+
+    def check_mesh(self, **kwargs):
+        # stop before decomposing when checkMesh reports failed checks
+        self.run_command(['checkMesh'], 'checkMesh')
+        ok, messages = parse_check_mesh(os.path.join(self.case_dir, 'logs', 'log.checkMesh'))
+        if not ok:
+            raise RuntimeError("checkMesh failed: {0}".format("; ".join(messages) or "see logs/log.checkMesh"))
+
+    def simplefoam(self, **kwargs):
+        # modify ABLConditions Dict
+        v = str(self.windSpeed)
+        h = str(self.windHeight)
+        t = str(self.simTime)
+
+        ABL_path = os.path.join(self.case_dir, '0', 'include', 'ABLConditions')
+        with open(ABL_path, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+        
+        line[8] = "Uref                 " + v + ";\n"
+        line[9] = "Zref                 " + h + ";\n"
+        line[11] = "flowDir              " + self.windDirection + ";\n"
+        line[12] = "z0                   uniform " + self.aeroRoughness + ";\n"
+
+        with open(ABL_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+        
+            # modify controlDict
+        control_template = os.path.join('simulation', 'system', 'controlDict')
+        control_path = os.path.join(self.case_dir, 'system', 'controlDict')
+        with open(control_template, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+        
+        # write the final iteration and snapshots-1 intermediate ones
+        profile = OUTPUT_PROFILES[self.outputProfile]
+        interval = max(1, int(math.ceil(self.simTime / self.snapshots)))
+        line[23] = "endTime         " + t + ";\n"
+        line[33] = "writeFormat     " + profile["writeFormat"] + ";\n"
+        line[35] = "writePrecision  " + str(profile["writePrecision"]) + ";\n"
+        line[37] = "writeCompression " + profile["writeCompression"] + ";\n"
+
+        if profile["sampling"]:
+            # the volume is only written at the end, snapshots are sampled on slices by the solver
+            line[29] = "writeInterval   " + t + ";\n"
+            probes = [(0, 0, h) for h in PROBE_HEIGHTS if h < self.height]
+            line[-1:-1] = sampling_functions(slice_heights(self.height), probes, interval)
+        else:
+            line[29] = "writeInterval   " + str(interval) + ";\n"
+
+        with open(control_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+
+            # modify fvSolution
+        solution_template = os.path.join('simulation', 'system', 'fvSolution')
+        solution_path = os.path.join(self.case_dir, 'system', 'fvSolution')
+        with open(solution_template, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+
+        # keep the header and the cache entry, write solvers, SIMPLE and relaxation from the preset
+        line[15:92] = fv_solution(self.solverPreset)
+
+        with open(solution_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+        
+            # modify decomposeParDict
+        decompose_path = os.path.join(self.case_dir, 'system', 'decomposeParDict.orig')
+        with open(decompose_path, "r", encoding="utf-8") as fr:
+            line = fr.readlines()
+        
+        line[18] = "method          scotch;\n"
+
+        with open(decompose_path, "w", encoding="utf-8") as fw:
+            fw.writelines(line)
+
+    def clear_results(self):
+        # the results of the previous run go, the checkMesh log stays while it matches the mesh
+        self.removeHistory(keep_logs=['log.checkMesh'])
+
+    def simulate_pipeline(self):
+        # run simulation, seeding U and p from potential flow when enabled.
+        # The processor directories hold the results of the previous run and are cleared before
+        # every simulation, so decomposePar and the solver stages always run. Only configure and
+        # checkMesh are skipped while the mesh and the parameters are unchanged.
+        stages = [Stage(
+            'configure',
+            self.simplefoam,
+            # a new mesh rewrites decomposeParDict.orig, configure has to write it again
+            inputs=[os.path.abspath(os.path.join('simulation', 'system', 'controlDict')), \
+                    os.path.abspath(os.path.join('simulation', 'system', 'fvSolution')), \
+                    os.path.join('system', 'blockMeshDict'), os.path.join('system', 'snappyHexMeshDict')],
+            outputs=[os.path.join('0', 'include', 'ABLConditions'), os.path.join('system', 'controlDict'), \
+                     os.path.join('system', 'fvSolution'), os.path.join('system', 'decomposeParDict.orig')],
+            params={"windSpeed": self.windSpeed, "windHeight": self.windHeight, "windDirection": self.windDirection, \
+                    "aeroRoughness": self.aeroRoughness, "simTime": self.simTime, "snapshots": self.snapshots, \
+                    "outputProfile": self.outputProfile, "solverPreset": self.solverPreset, \
+                    "mesh": read_stamps(self.case_dir).get('mesh')},
+        ), Stage(
+            'checkMesh',
+            self.check_mesh,
+            inputs=[os.path.join('constant', 'polyMesh')],
+            outputs=[os.path.join('logs', 'log.checkMesh')],
+            progress=3,
+        )]
+        stages.append(Stage(
+            'decomposePar',
+            lambda: self.run_command(['decomposePar', '-force'], 'decomposePar'),
+            inputs=[os.path.join('constant', 'polyMesh')],
+            outputs=['processor0'],
+            after=['configure', 'checkMesh'],
+            progress=2,
+        ))
+        # reorder the cells of each processor mesh for a narrower matrix bandwidth
+        stages.append(Stage(
+            'renumberMesh',
+            lambda: self.run_command(['renumberMesh', '-overwrite'], 'renumberMesh', NPROCS),
+            after=['decomposePar'],
+            progress=3,
+        ))
+        solve_after = ['renumberMesh']
+        if self.potentialInit:
+            stages.append(Stage(
+                'potentialFoam',
+                lambda: self.run_command(['potentialFoam', '-initialiseUBCs', '-writep', '-writePhi'], \
+                                         'potentialFoam', NPROCS),
+                outputs=[os.path.join('processor0', '0', 'phi')],
+                after=['renumberMesh'],
+                progress=5,
+            ))
+            solve_after = ['potentialFoam']
+        stages.append(Stage(
+            'simpleFoam',
+            lambda: self.run_command(['simpleFoam'], 'simpleFoam', NPROCS),
+            after=solve_after,
+            progress=62 if self.potentialInit else 67,
+        ))
+        reconstruct = ['reconstructPar']
+        fields = OUTPUT_PROFILES[self.outputProfile]["fields"]
+        if fields is not None:
+            reconstruct += ['-fields', '({0})'.format(' '.join(fields))]
+        stages.append(Stage(
+            'reconstructPar',
+            lambda: self.run_command(reconstruct, 'reconstructPar'),
+            after=['simpleFoam'],
+            progress=5,
+        ))
+        return Pipeline(self.case_dir, stages)
+
+    def record_run(self, timings):
+        log_path = os.path.join(self.case_dir, 'logs', 'log.simpleFoam')
+        iterations, converged = parse_iterations(log_path)
+        # the signature of configure covers the mesh and every parameter of the solver but the initialization
+        setup = read_stamps(self.case_dir).get('configure')
+        run = {
+            "potentialInit": self.potentialInit,
+            "solverPreset": self.solverPreset,
+            "windSpeed": self.windSpeed,
+            "simTime": self.simTime,
+            "timings": timings,
+            "iterations": iterations,
+            "converged": converged,
+            "setup": setup,
+        }
+        self.metadata["runs"].append(run)
+
+        # keep the latest iteration count with and without initialization for comparison,
+        # only runs on the same mesh with the same parameters are compared
+        if setup is not None:
+            counts = self.metadata["iterations"].setdefault(setup, {})
+            counts["initialized" if self.potentialInit else "uninitialized"] = iterations
+            if counts.get("initialized") is not None and counts.get("uninitialized") is not None:
+                counts["saved"] = counts["uninitialized"] - counts["initialized"]
+
+        # accumulate solver iterations and time per preset to compare them across runs
+        preset = self.metadata.setdefault("presets", {}).setdefault(
+            self.solverPreset, {"runs": 0, "iterations": 0, "seconds": 0.0})
+        preset["runs"] += 1
+        preset["iterations"] += iterations or 0
+        preset["seconds"] += timings.get("simpleFoam") or 0.0
+
+        metadata_path = os.path.join(self.case_dir, 'metadata.json')
+        with open(metadata_path, "w", encoding="utf-8") as fw:
+            json.dump(self.metadata, fw, indent=2)
+        logger.info("simpleFoam took %s iterations (potential flow initialization: %s, preset: %s)", \
+                    iterations, self.potentialInit, self.solverPreset)
+
+
+def reap_cases(data_dir):
+    """Clean up after a previous server on data_dir, before any case is created
+
+    Cases nothing was run on are removed, those it was still working on are marked failed.
+    Return the number of both.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    registry = CaseRegistry(os.path.join(data_dir, REGISTRY_FILE))
+    unused = registry.list(status="created", limit=-1)
+    for case in unused:
+        shutil.rmtree(case["case_dir"], ignore_errors=True)
+        registry.delete(case["id"])
+    interrupted = registry.fail_active("Interrupted by a restart of the server")
+    registry.close()
+    if unused or interrupted:
+        logger.info("Removed %d unused cases, marked %d interrupted cases failed", len(unused), interrupted)
+    return len(unused), interrupted
+
+
+def read_metadata(case_dir):
+    metadata_path = os.path.join(case_dir, 'metadata.json')
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path, "r", encoding="utf-8") as fr:
+        return json.load(fr)
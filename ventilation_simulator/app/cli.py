@@ -0,0 +1,34 @@
+"""
+Command line options of the application
+
+Kept free of ParaView and widget imports so that ``--help`` and option
+parsing do not pay for them. The options are added to the command line of
+the trame server by ``main`` only, to show them in ``--help``. The engine
+reads them with a parser of its own, so it never registers them twice.
+"""
+import argparse
+
+from .executor import EXECUTORS
+
+
+def add_arguments(parser):
+    # Select where the OpenFOAM commands are executed
+    parser.add_argument("--executor", choices=EXECUTORS, default="local", \
+                        help="Run OpenFOAM locally, over an MPI hostfile or through a batch scheduler")
+    parser.add_argument("--hostfile", default=None, help="MPI hostfile for the hostfile executor")
+    parser.add_argument("--batch-submit", default="sbatch", help="Job submission command for the batch executor")
+    parser.add_argument("--batch-poll", type=float, default=5.0, help="Seconds between batch job polls")
+    parser.add_argument("--batch-timeout", type=float, default=None, help="Seconds a batch job may take before it fails")
+    parser.add_argument("--batch-status", default="squeue -h -o %T -j", \
+                        help="Command printing the state of a batch job given its id, empty to only wait for the job")
+    parser.add_argument("--data-dir", default="./data", help="Directory keeping the case registry and workspaces")
+    parser.add_argument("--max-jobs", type=int, default=2, help="Jobs of the job API simulated at the same time")
+    parser.add_argument("--slice-cache-mb", type=float, default=256, help="Memory limit of the results timeline cache")
+    parser.add_argument("--compare-cache-mb", type=float, default=128, help="Memory limit of the runs resampled for comparison")
+    return parser
+
+
+def parse_options(argv=None):
+    """Return the options of the application in argv (sys.argv by default), ignoring any other"""
+    args, _ = add_arguments(argparse.ArgumentParser(add_help=False)).parse_known_args(argv)
+    return args
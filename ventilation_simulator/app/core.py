@@ -4,10 +4,12 @@ Define your classes and create the instances that you need to expose
 import paraview.web.venv  # Available in PV 5.10
 import os
 import subprocess
-import shutil
-import tempfile
 import logging
 import asyncio
+import glob
+import time
+
+from aiohttp import web
 
 from trame.app import get_server, asynchronous
 from trame.widgets import vuetify, paraview
@@ -15,12 +17,31 @@ from trame.ui.vuetify import SinglePageWithDrawerLayout
 from trame.widgets import vtk, vuetify, trame
 
 
-from paraview import simple
-
+from paraview import simple, servermanager
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkIOLegacy import vtkPolyDataReader
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+
+from .api import JobRunner, add_routes as add_job_routes
+from .cache import LRUCache
+from .case import Case, PATCH_FACES, ROUGHNESS, TEMPLATE_DIR
+from .cli import parse_options
+from .compare import difference, grid_dims, grid_spacing, plane, run_bounds, shared_bounds, slice_index, \
+    symmetric_range, velocity_grid
+from .executor import create_executor
+from .download import add_routes
+from .presets import OUTPUT_PROFILES, SAMPLES_DIR, SOLVER_PRESETS, slice_heights, surface_name
+from .proxies import ProxyTracker, memory_report
+from .registry import CaseRegistry, REGISTRY_FILE
+from .streamlines import StreamlineTracer, MAX_SEEDS, MAX_STEPS
+from .thumbnails import THUMBNAIL_DIR, THUMBNAIL_SIZE, THUMBNAIL_SLICE_HEIGHT, thumbnail_path, thumbnail_urls
+from .thumbnails import add_routes as add_thumbnail_routes
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+CASES_PER_PAGE = 10
+
 # ---------------------------------------------------------
 # Engine class
 # ---------------------------------------------------------
@@ -41,6 +62,11 @@ class Engine:
 
         # Bind instance methods to controller
         ctrl.on_server_reload = self.ui
+        ctrl.on_server_bind.add(self.bind_routes)
+
+        # Named triggers, so that scripted clients can press the buttons too
+        server.trigger("run_set")(self.run_set)
+        server.trigger("run_sim")(self.run_sim)
 
         # Bind instance methods to state change
         state.change("files")(self.read)
@@ -55,44 +81,83 @@ class Engine:
         state.change("aeroRoughness")(self.set_aeroRoughness)
         state.change("mySimTime")(self.set_simTime)
         state.change("slicePos")(self.set_slicePos)
-
-        # Create temporary directory for uer simulation
-        self.user = tempfile.TemporaryDirectory(dir='./')
-        shutil.copytree('./simulation', self.user.name, dirs_exist_ok=True)
-        self.USER_DIR = self.user.name
+        state.change("timeIndex")(self.set_timeIndex)
+        state.change("mySnapshots")(self.set_snapshots)
+        state.change("outputProfile")(self.set_outputProfile)
+        state.change("showStreamlines", "seedType", "seedX", "seedY", "seedZ", "seedCount", "seedSize", \
+                     "maxSteps")(self.update_streamlines)
+        state.change("potentialInit")(self.set_potentialInit)
+        state.change("solverPreset")(self.set_solverPreset)
+        state.change("casePage")(self.list_cases)
+        state.change("compareSlicePos")(self.update_compare_slices)
+
+        # Select where the OpenFOAM commands are executed
+        args = parse_options()
+        self.executor = create_executor(args.executor, hostfile=args.hostfile, \
+                                        submit=args.batch_submit, poll_interval=args.batch_poll, \
+                                        timeout=args.batch_timeout, status=args.batch_status)
+
+        # Register the cases of the session in a persistent registry
+        self.data_dir = args.data_dir
+
+        # Slices already extracted for the results timeline, bounded in memory
+        self.slice_cache = LRUCache(args.slice_cache_mb * 2 ** 20)
+        self.timesteps = []
+        self.samples = dict()
+
+        # Streamline tracer of the displayed result, keeps its cell locator between seeds
+        self.tracer = None
+        self.tracer_time = None
+        self.streamlines = None
+
+        # Every proxy of the session is tracked so that replaced runs are released
+        self.proxies = ProxyTracker()
+        self.foam_reader = None
+        self.slice = None
+        self.timeline = None
+
+        # Offscreen view rendering the thumbnails of completed runs
+        self.thumbnail_view = None
+
+        # Runs resampled onto the grids shared with the runs they were compared to
+        self.grid_cache = LRUCache(args.compare_cache_mb * 2 ** 20)
+        self.comparison = None
+        self.compare_producers = []
+        os.makedirs(os.path.join(self.data_dir, 'cases'), exist_ok=True)
+        self.registry = CaseRegistry(os.path.join(self.data_dir, REGISTRY_FILE))
+
+        # Cases submitted over the job API share the registry and the executor
+        self.jobs = JobRunner(self.registry, self.executor, self.data_dir, args.max_jobs)
 
         # Initialize internal and state variables
         
-        self.FILENAMES = []
         self.DEFAULT_VALUE = 5
 
         self.uploaded = False
         self.stl_readers = dict()
-        self.length = 5
-        self.width = 5
-        self.height = 5
-        self.inlet = ""
-        self.outlet = ""
         self.toSet = False
         self.setSuccess = False
-
-        self.windSpeed = 5
-        self.windHeight = 5
-        self.windDirection = ""
-        self.aeroRoughness = ""
-        self.simTime = 5
         self.toSimulate = False
 
-        self.changeFile = False
         self.changeSim = False
+
+        # Create the workspace of the user simulation
+        self.new_case()
+        self.list_cases()
         
         # Initialize Pipeline Widget
         state.setdefault("active_ui", "environment")
+        state.setdefault("timeValue", 0)
+        state.setdefault("compareTitles", [])
 
         # Initialize ParaView
         self.view = simple.GetRenderView()
         self.view = simple.Render()
 
+        # Linked views of compare mode, created by the first comparison
+        self.compare_views = []
+        self.compare_updates = []
+
         # Generate UI
         self.ui()
 
@@ -108,6 +173,21 @@ class Engine:
     def ctrl(self):
         return self.server.controller
 
+    @property
+    def foam_path(self):
+        return self.case.foam_path
+
+    def bind_routes(self, wslink_server, **kwargs):
+        # serve case archives next to the application
+        add_routes(wslink_server.app, self.registry)
+        add_job_routes(wslink_server.app, self.jobs)
+        add_thumbnail_routes(wslink_server.app, self.registry)
+
+        async def memory(request):
+            return web.json_response(self.report_memory())
+
+        wslink_server.app.router.add_get("/memory", memory)
+
     def show_in_jupyter(self, **kwargs):
         from trame.app import jupyter
 
@@ -131,23 +211,150 @@ class Engine:
         homogeneous = 6
         varying = 7
 
+    # Methods for Case Registry
+    def new_case(self, source=TEMPLATE_DIR, parent=None, inputs=None):
+        self.case = Case.create(self.registry, self.executor, self.data_dir, source, parent, inputs)
+
+    def writable_case(self):
+        # completed cases are kept as they are, further changes go to a copy of them
+        if self.case.status == "completed":
+            self.case = self.case.fork()
+
+    def update_case(self, status, **kwargs):
+        self.case.update(status, **kwargs)
+
+    def list_cases(self, casePage=1, **kwargs):
+        total = self.registry.count(status="completed")
+        cases = self.registry.list(status="completed", offset=(int(casePage) - 1) * CASES_PER_PAGE, \
+                                   limit=CASES_PER_PAGE)
+        with self.state:
+            self.state.casePages = max(1, -(-total // CASES_PER_PAGE))
+            self.state.cases = [
+                {
+                    "id": case["id"],
+                    "title": self.case_title(case),
+                    "subtitle": time.strftime("%Y-%m-%d %H:%M", time.localtime(case["updated"])),
+                    "metrics": "{0} iterations, {1:.0f} s, {2}".format(
+                        case["metrics"].get("iterations") or "-", \
+                        case["metrics"].get("timings", {}).get("simpleFoam") or 0, \
+                        case["inputs"].get("solverPreset", "balanced")),
+                    "thumbnails": thumbnail_urls(case),
+                }
+                for case in cases
+            ]
+
+    def case_title(self, case):
+        return "{0} - {1} m/s".format(", ".join(case["inputs"].get("files", [])), case["inputs"].get("windSpeed"))
+
+    def release_results(self):
+        self.release_environment()
+        self.release_foam()
+
+    def release_environment(self):
+        self.proxies.release("environment")
+        self.stl_readers.clear()
+
+    def release_foam(self):
+        # slices and streamlines are deleted before the reader they were extracted from
+        self.proxies.release("results")
+        self.foam_reader = None
+        self.slice = None
+        self.timeline = None
+        self.streamlines = None
+        self.tracer = None
+        self.slice_cache.clear()
+        self.changeSim = False
+
+    def report_memory(self):
+        report = memory_report(self.proxies)
+        logger.info("Proxies tracked: %s, live: %s, RSS: %s MB", report["tracked"], report["live"], \
+                    None if report["rss"] is None else round(report["rss"] / 2 ** 20, 1))
+        return report
+
+    def reset(self):
+        # prepare the engine of a pooled worker for its next session
+        self.release_results()
+        self.release_comparison()
+        self.uploaded = False
+        self.toSet = False
+        self.setSuccess = False
+        if self.case.status == "created":
+            # nothing was run on the case of the session, the next session starts from it
+            self.case.clear_uploads()
+        else:
+            # the selections of the UI stay as they are, no change callback fills them in again
+            self.new_case(inputs=dict(self.case.inputs(), files=[]))
+        with self.state:
+            self.state.update({
+                "files": None,
+                "active_ui": "environment",
+                "setProgress": 0,
+                "simProgress": 0,
+                "errorMessage": "",
+                "downloadUrl": "",
+                "set_running": True,
+                "sim_running": True,
+                "postProcessing": True,
+                "compareMode": False,
+                "compareA": None,
+                "compareB": None,
+            })
+        self.list_cases()
+        self.ctrl.view_reset_camera()
+        self.ctrl.view_update()
+
+    def open_case(self, case_id):
+        # show a completed case from the registry without recomputing it
+        case = Case.open(self.registry, self.executor, case_id)
+        if case is None or case.status != "completed":
+            logger.warning("Case %s cannot be opened", case_id)
+            return
+
+        self.release_results()
+        if self.case.status == "created":
+            self.case.discard()
+        self.case = case
+
+        save_path = os.path.join(self.case.case_dir, 'constant', 'triSurface')
+        for file in self.case.files:
+            self.stl_readers[file.split('.')[0]] = self.proxies.track(
+                "environment", simple.STLReader(FileNames=[os.path.join(save_path, file)]))
+
+        with self.state:
+            self.state.update({
+                "myLength": self.case.length,
+                "myWidth": self.case.width,
+                "myHeight": self.case.height,
+                "inlet": PATCH_FACES.index(self.case.inlet),
+                "outlet": PATCH_FACES.index(self.case.outlet),
+                "myWindSpeed": self.case.windSpeed,
+                "myWindHeight": self.case.windHeight,
+                "aeroRoughness": ROUGHNESS.index(self.case.aeroRoughness),
+                "mySimTime": self.case.simTime,
+                "mySnapshots": self.case.snapshots,
+                "outputProfile": self.case.outputProfile,
+                "potentialInit": self.case.potentialInit,
+                "solverPreset": self.case.solverPreset,
+                "postProcessing": False,
+                "setProgress": 100,
+                "simProgress": 100,
+                "downloadUrl": "download/{0}".format(case_id),
+            })
+        self.uploaded = True
+        self.setSuccess = True
+        self.view_foam()
+        self.state.sim_running = False
+
     def read(self, files, **kwargs):
         if files is None or len(files) == 0:
-            if self.uploaded:
-                for reader in self.stl_readers:
-                    simple.Delete(self.stl_readers[reader])
-            if self.changeFile:
-                simple.Delete(self.foam_reader)
-            if self.changeSim:
-                simple.Delete(self.slice)
-                self.changeSim = False
+            self.release_results()
             self.ctrl.view_update()
-            self.stl_readers.clear()
             self.toSet = False
             self.state.set_running = True
             return
         
-        save_path = os.path.join(self.USER_DIR, 'constant', 'triSurface')
+        self.writable_case()
+        save_path = os.path.join(self.case.case_dir, 'constant', 'triSurface')
         input_list = []
 
         for file in files:
@@ -164,10 +371,12 @@ class Engine:
         for file_ in file_diff:
             os.remove(os.path.join(save_path, file_))
 
-        # assign readers to each stl in save_path
-        self.FILENAMES = os.listdir(save_path)
-        for i in self.FILENAMES:
-            self.stl_readers["{0}".format(i.split('.')[0])] = simple.STLReader(FileNames=[os.path.join(save_path, i)])
+        # assign readers to each stl in save_path, replacing those of a previous upload
+        self.release_environment()
+        self.case.files = os.listdir(save_path)
+        for i in self.case.files:
+            self.stl_readers["{0}".format(i.split('.')[0])] = self.proxies.track(
+                "environment", simple.STLReader(FileNames=[os.path.join(save_path, i)]))
         
         for reader in self.stl_readers:
             environment = simple.Show(self.stl_readers[reader], self.view, 'GeometryRepresentation')
@@ -189,7 +398,7 @@ class Engine:
     def set_length(self, myLength, **kwargs):
         isPositive = self.validate_number(myLength)
         if isPositive:
-            self.length = float(myLength)
+            self.case.length = float(myLength)
             self.state.set_running = False
             return
         self.state.set_running = True
@@ -197,7 +406,7 @@ class Engine:
     def set_width(self, myWidth, **kwargs):
         isPositive = self.validate_number(myWidth)
         if isPositive:
-            self.width = float(myWidth)
+            self.case.width = float(myWidth)
             self.state.set_running = False
             return
         self.state.set_running = True
@@ -205,266 +414,72 @@ class Engine:
     def set_height(self, myHeight, **kwargs):
         isPositive = self.validate_number(myHeight)
         if isPositive:
-            self.height = float(myHeight)
+            self.case.height = float(myHeight)
             self.state.set_running = False
             return
         self.state.set_running = True
     
     def validate_patch(self):
-        if self.inlet == self.outlet:
+        if self.case.inlet == self.case.outlet:
             self.state.set_running = True
             return
         self.state.set_running = False
 
     def set_inlet(self, inlet, **kwargs):
         if inlet == self.Patch.front:
-            self.inlet = "(0 1 5 4)"
-            if self.outlet == "(0 4 7 3)":      #front-left
-                self.windDirection = "(-1 -1 0)"
-            elif self.outlet == "(0 4 7 3)":    #front-right
-                self.windDirection = "(1 -1 0)"
-            self.windDirection = "(0 -1 0)"     #front-back
+            self.case.inlet = "(0 1 5 4)"
+            if self.case.outlet == "(0 4 7 3)":      #front-left
+                self.case.windDirection = "(-1 -1 0)"
+            elif self.case.outlet == "(0 4 7 3)":    #front-right
+                self.case.windDirection = "(1 -1 0)"
+            self.case.windDirection = "(0 -1 0)"     #front-back
         elif inlet == self.Patch.back:
-            self.inlet = "(3 7 6 2)"
-            if self.outlet == "(0 4 7 3)":      #back-left
-                self.windDirection = "(-1 1 0)"
-            elif self.outlet == "(0 4 7 3)":    #back-right
-                self.windDirection = "(1 1 0)"
-            self.windDirection = "(0 1 0)"      #back-front
+            self.case.inlet = "(3 7 6 2)"
+            if self.case.outlet == "(0 4 7 3)":      #back-left
+                self.case.windDirection = "(-1 1 0)"
+            elif self.case.outlet == "(0 4 7 3)":    #back-right
+                self.case.windDirection = "(1 1 0)"
+            self.case.windDirection = "(0 1 0)"      #back-front
         elif inlet == self.Patch.left:
-            self.inlet = "(0 4 7 3)"
-            if self.outlet == "(0 1 5 4)":      #left-front
-                self.windDirection = "(-1 -1 0)"
-            elif self.outlet == "(3 7 6 2)":    #left-back
-                self.windDirection = "(-1 1 0)"
-            self.windDirection = "(-1 0 0)"     #left-right
+            self.case.inlet = "(0 4 7 3)"
+            if self.case.outlet == "(0 1 5 4)":      #left-front
+                self.case.windDirection = "(-1 -1 0)"
+            elif self.case.outlet == "(3 7 6 2)":    #left-back
+                self.case.windDirection = "(-1 1 0)"
+            self.case.windDirection = "(-1 0 0)"     #left-right
         elif inlet == self.Patch.right:
-            self.inlet = "(1 2 6 5)"
-            if self.outlet == "(0 1 5 4)":      #right-front
-                self.windDirection = "(1 -1 0)"
-            elif self.outlet == "(3 7 6 2)":    #right-back
-                self.windDirection = "(1 1 0)"
-            self.windDirection = "(1 0 0)"      #right-left
+            self.case.inlet = "(1 2 6 5)"
+            if self.case.outlet == "(0 1 5 4)":      #right-front
+                self.case.windDirection = "(1 -1 0)"
+            elif self.case.outlet == "(3 7 6 2)":    #right-back
+                self.case.windDirection = "(1 1 0)"
+            self.case.windDirection = "(1 0 0)"      #right-left
         self.validate_patch()
 
     def set_outlet(self, outlet, **kwargs):
         if outlet == self.Patch.front:
-            self.outlet = "(0 1 5 4)"
+            self.case.outlet = "(0 1 5 4)"
         elif outlet == self.Patch.back:
-            self.outlet = "(3 7 6 2)"
+            self.case.outlet = "(3 7 6 2)"
         elif outlet == self.Patch.left:
-            self.outlet = "(0 4 7 3)"
+            self.case.outlet = "(0 4 7 3)"
         elif outlet == self.Patch.right:
-            self.outlet= "(1 2 6 5)"
+            self.case.outlet= "(1 2 6 5)"
         self.validate_patch()
 
-    def removeHistory(self):
-        #os.remove(os.path.join(self.USER_DIR, '{0}.foam'.format(self.USER_DIR.split('/')[1])))
-        orig = ['0', 'constant', 'system', '{0}.foam'.format(self.USER_DIR.split('/')[1])]
-        for dir in os.listdir(self.USER_DIR):
-            if dir not in orig:
-                shutil.rmtree(os.path.join(self.USER_DIR, dir))
-
-    def convert(self, **kwargs):
-        conversion_template = os.path.join('simulation', 'system', 'surfaceFeaturesDict')
-        conversion_path = os.path.join(self.USER_DIR, 'system', 'surfaceFeaturesDict')
-        with open(conversion_template, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-
-        line_ = line[16:]
-        del line[16:]
-
-        for file in self.FILENAMES:
-            line.append("\"{0}\"\n".format(file))
-        
-        line += line_
-
-        with open(conversion_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-
-        toEmesh = subprocess.Popen('surfaceFeatures', cwd=self.USER_DIR)
-        toEmesh.wait()
-        self.update_setProgress(2)
-    
-    def block(self, **kwargs):
-        # Modify blockMesh
-        x = self.length
-        y = self.width
-        z = self.height
-        vertices = [(-x, -y, 0), (x, -y, 0), (x, y, 0), (-x, y, 0), \
-                    (-x, -y, z), (x, -y, z), (x, y, z), (-x, y, z)]
-
-        block_template = os.path.join('simulation', 'system', 'blockMeshDict')
-        block_path = os.path.join(self.USER_DIR, 'system', 'blockMeshDict')
-
-        with open(block_template, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-
-        i = 19
-        while i < 25:
-            for v in vertices:
-                line[i] = "    (" + str(v[0]) + " " + str(v[1]) + " " + str(v[2]) + ")\n"
-                i+=1
-        
-        line[46] = "            " + self.inlet + "\n"
-        line[63] = "            " + self.outlet + "\n" 
-
-        patches_val = ["(0 1 5 4)", "(3 7 6 2)", "(0 4 7 3)", "(1 2 6 5)"]
-        patches_val.remove(self.inlet)
-        patches_val.remove(self.outlet)
-
-        line[54] = "            " + patches_val[0] + "\n"
-        line[55] = "            " + patches_val[1] + "\n"
-
-        with open(block_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-        
-        # Modify Coefficients
-        coeffs = ["epsilon", "k", "nut", "p", "U"]
-        for coeff in coeffs:
-            coeff_template = os.path.join('simulation', '0', coeff)
-            with open(coeff_template, "r", encoding="utf-8") as fr:
-                line = fr.readlines()
-            for file in self.FILENAMES:
-                content = self.coeffContent(coeff, file)
-                coeff_path = os.path.join(self.USER_DIR, '0', coeff)
-        
-                for i in content:
-                    line.append(i)
-
-                with open(coeff_path, "w", encoding="utf-8") as fw:
-                    if file == self.FILENAMES[-1]:
-                        line.append("}\n")
-                    fw.writelines(line)
-
-
-        toBlock = subprocess.Popen("blockMesh", cwd=self.USER_DIR)
-        toBlock.wait()
-        self.update_setProgress(15)
-
-    def coeffContent(self, coeff, file):
-        epsilon = ["    {0}\n".format(file.split('.')[0]), \
-                "    {\n", "        type            epsilonWallFunction;\n", \
-                "        Cmu             0.09;\n", "        kappa           0.4;\n", \
-                "        E               9.8;\n", "        value           $internalField;\n", \
-                "    }\n", "\n"]
-        
-        k = ["    {0}\n".format(file.split('.')[0]), \
-            "    {\n", "        type            kqRWallFunction;\n", \
-            "        value           uniform 0.0;\n", \
-            "    }\n", "\n"]
-        
-        nut = ["    {0}\n".format(file.split('.')[0]), \
-            "    {\n", "        type            nutkAtmRoughWallFunction;\n", \
-            "        z0              $z0;\n", "        value           uniform 0.0;\n", \
-            "    }\n", "\n"]
-
-        p = ["    {0}\n".format(file.split('.')[0]), \
-            "    {\n", "        type            zeroGradient;\n", \
-            "    }\n", "\n"]
-        
-        U = ["    {0}\n".format(file.split('.')[0]), \
-            "    {\n", "        type            noSlip;\n", \
-            "    }\n", "\n"]
-        
-
-        if coeff == "epsilon":
-            return epsilon
-        elif coeff == "k":
-            return k
-        elif coeff == "nut":
-            return nut
-        elif coeff == "p":
-            return p
-        elif coeff == "U":
-            return U
-    
-    def mesh(self, **kwargs):
-        mesh_template = os.path.join('simulation', 'system', 'snappyHexMeshDict')
-        mesh_path = os.path.join(self.USER_DIR, 'system', 'snappyHexMeshDict')
-
-        with open(mesh_template, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-        
-        a = line[30:81]
-        b = line[81:96]
-        c = line[96:]
-        del line[30:]
-        toModify = ["geometry", "features", "surfaces"]
-
-        for part in toModify:
-            for file in self.FILENAMES:
-                content = self.snappyContent(file, part)
-                line += content
-            if part == toModify[0]:
-                line += a
-            elif part == toModify[1]:
-                line += b
-            else:
-                line += c
-        
-        with open(mesh_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-        
-        # modify decomposeParDict
-        decompose_path = os.path.join(self.USER_DIR, 'system', 'decomposeParDict.orig')
-        with open(decompose_path, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-        
-        line[18] = "method          hierarchical;\n"
-
-        with open(decompose_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-
-        commands = [['decomposePar', '-force'], ['mpirun', '-np', '12', 'snappyHexMesh', '-parallel', '-overwrite'], ['reconstructParMesh', '-constant']]
-        
-        for cmd in commands:
-            process = subprocess.Popen(cmd, cwd=self.USER_DIR)
-            process.wait()
-        self.update_setProgress(78)
-    
-
-    def snappyContent(self, file, toModify):
-        geometry = ["    {0}\n".format(file.split('.')[0]), \
-                    "    {\n", "        type triSurfaceMesh;\n", \
-                    "        file \"{0}\";\n".format(file), \
-                    "    }\n", "\n"]
-
-        features = ["        {\n", "            file \"{0}.{1}\";\n".format(file.split('.')[0], "eMesh"), \
-                    "            level 2;\n", "        }\n"]
-
-        surfaces = ["        {0}\n".format(file.split('.')[0]), \
-                    "        {\n", "            level (2 2);\n", \
-                    "        }\n", "\n"]
-        
-        if toModify == "geometry":
-            return geometry
-        elif toModify == "features":
-            return features
-        elif toModify == "surfaces":
-            return surfaces
-        
-
     def view_environment(self, **kwargs):
+        self.release_foam()
         if self.setSuccess:
-            simple.Delete(self.foam_reader)
-            del self.foam_reader
-            if self.changeSim:
-                simple.Delete(self.slice)
-                del self.slice
-                self.changeSim = False
             self.ctrl.view_reset_camera()
             self.ctrl.view_update()
 
         for reader in self.stl_readers:
             simple.Hide(self.stl_readers[reader], self.view)
 
-        toFoam = subprocess.Popen(['paraFoam', '-builtin', '-touch'], cwd=self.USER_DIR)
+        toFoam = subprocess.Popen(['paraFoam', '-builtin', '-touch'], cwd=self.case.case_dir)
         toFoam.wait()
 
-        foam_file = self.USER_DIR + ".foam"
-        foam_path = os.path.join(self.USER_DIR, foam_file)
-        self.foam_reader = simple.OpenFOAMReader(FileName=foam_path)
+        self.foam_reader = self.proxies.track("results", simple.OpenFOAMReader(FileName=self.foam_path))
         environment = simple.Show(self.foam_reader, self.view)
         environment.Opacity = 0.25
         self.view.AxesGrid.Visibility = 1
@@ -479,24 +494,28 @@ class Engine:
 
     @asynchronous.task
     async def _async_set(self, **kwargs):
-        self.convert()
-        await asyncio.sleep(0.01)
-        self.block()
-        await asyncio.sleep(0.01)
-        self.mesh()
-        await asyncio.sleep(0.05)
+        try:
+            await self.case.run_set(lambda stage, seconds: self.update_setProgress(stage.progress))
+        except Exception as error:
+            logger.error("Setting the environment failed: %s", error)
+            with self.state:
+                self.state.errorMessage = str(error)
+                self.state.set_running = False
+            return
         self.view_environment()
-        await asyncio.sleep(0.01)
-        self.changeFile = True
         self.setSuccess = True
+        self.report_memory()
         with self.state:
             self.state.set_running = False
             self.state.sim_running = False
     
     async def run_set(self, **kwargs):
         if self.toSet and not self.state.set_running:
-            self.removeHistory()
+            self.writable_case()
+            self.update_case("meshing")
+            self.case.removeHistory()
             self.state.setProgress = 0
+            self.state.errorMessage = ""
             await asyncio.sleep(0.01)
             self.state.set_running = True
             asynchronous.create_task(self._async_set())
@@ -504,7 +523,7 @@ class Engine:
     def set_windSpeed(self, myWindSpeed, **kwargs):
         isPositive = self.validate_number(myWindSpeed)
         if isPositive and self.setSuccess:
-            self.windSpeed = float(myWindSpeed)
+            self.case.windSpeed = float(myWindSpeed)
             self.state.sim_running = False
             return
         self.state.sim_running = True
@@ -512,92 +531,59 @@ class Engine:
     def set_windHeight(self, myWindHeight, **kwargs):
         isPositive = self.validate_number(myWindHeight)
         if isPositive and self.setSuccess:
-            self.windHeight = float(myWindHeight)
+            self.case.windHeight = float(myWindHeight)
             self.state.sim_running = False
             return
         self.state.sim_running = True
 
     def set_aeroRoughness(self, aeroRoughness, **kwargs):
         if aeroRoughness == self.Landscape.open:
-            self.aeroRoughness = "0.0002"
+            self.case.aeroRoughness = "0.0002"
         elif aeroRoughness == self.Landscape.negligible:
-            self.aeroRoughness = "0.005"
+            self.case.aeroRoughness = "0.005"
         elif aeroRoughness == self.Landscape.minimal:
-            self.aeroRoughness = "0.03"
+            self.case.aeroRoughness = "0.03"
         elif aeroRoughness == self.Landscape.occassional:
-            self.aeroRoughness = "0.10"
+            self.case.aeroRoughness = "0.10"
         elif aeroRoughness == self.Landscape.scattered:
-            self.aeroRoughness = "0.25"
+            self.case.aeroRoughness = "0.25"
         elif aeroRoughness == self.Landscape.large:
-            self.aeroRoughness = "0.5"
+            self.case.aeroRoughness = "0.5"
         elif aeroRoughness == self.Landscape.homogeneous:
-            self.aeroRoughness = "1.0"
+            self.case.aeroRoughness = "1.0"
         elif aeroRoughness == self.Landscape.varying:
-            self.aeroRoughness = "2.0"
+            self.case.aeroRoughness = "2.0"
     
     def set_simTime(self, mySimTime, **kwargs):
         isPositive = self.validate_number(mySimTime)
         if isPositive and self.setSuccess:
-            self.simTime = float(mySimTime)
+            self.case.simTime = float(mySimTime)
             self.state.sim_running = False
             return
         self.state.sim_running = True
 
-    def simplefoam(self, **kwargs):
-        # modify ABLConditions Dict
-        v = str(self.windSpeed)
-        h = str(self.windHeight)
-        t = str(self.simTime)
+    def set_snapshots(self, mySnapshots, **kwargs):
+        isPositive = self.validate_number(mySnapshots)
+        if isPositive and self.setSuccess:
+            self.case.snapshots = max(1, int(float(mySnapshots)))
+            self.state.sim_running = False
+            return
+        self.state.sim_running = True
 
-        ABL_path = os.path.join(self.USER_DIR, '0', 'include', 'ABLConditions')
-        with open(ABL_path, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-        
-        line[8] = "Uref                 " + v + ";\n"
-        line[9] = "Zref                 " + h + ";\n"
-        line[11] = "flowDir              " + self.windDirection + ";\n"
-        line[12] = "z0                   uniform " + self.aeroRoughness + ";\n"
+    def set_outputProfile(self, outputProfile, **kwargs):
+        if outputProfile in OUTPUT_PROFILES:
+            self.case.outputProfile = outputProfile
 
-        with open(ABL_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-        
-            # modify controlDict
-        control_path = os.path.join(self.USER_DIR, 'system', 'controlDict')
-        with open(control_path, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-        
-        line[23] = "endTime         " + t + ";\n"
-        line[29] = "writeInterval   " + t + ";\n"
+    def set_potentialInit(self, potentialInit, **kwargs):
+        self.case.potentialInit = bool(potentialInit)
 
-        with open(control_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-        
-            # modify decomposeParDict
-        decompose_path = os.path.join(self.USER_DIR, 'system', 'decomposeParDict.orig')
-        with open(decompose_path, "r", encoding="utf-8") as fr:
-            line = fr.readlines()
-        
-        line[18] = "method          scotch;\n"
+    def set_solverPreset(self, solverPreset, **kwargs):
+        if solverPreset in SOLVER_PRESETS:
+            self.case.solverPreset = solverPreset
 
-        with open(decompose_path, "w", encoding="utf-8") as fw:
-            fw.writelines(line)
-        
-            # run simulation
-        commands = [['decomposePar', '-force'], ['mpirun', '-np', '12', 'simpleFoam', '-parallel'], \
-                    ['reconstructPar'],]
-
-        for cmd in commands:
-            process = subprocess.Popen(cmd, cwd=self.USER_DIR)
-            process.wait()
-        self.update_simProgress(80)
-    
     def view_foam(self, **kwargs):
+        self.release_foam()
         if self.state.postProcessing:
-            simple.Delete(self.foam_reader)
-            del self.foam_reader
-            if self.changeSim:
-                simple.Delete(self.slice)
-                del self.slice
             self.ctrl.view_reset_camera()
             self.ctrl.view_update()
 
@@ -605,28 +591,29 @@ class Engine:
             environment = simple.Show(self.stl_readers[reader], self.view, 'GeometryRepresentation')
             environment.Opacity = 0.25
         
-        toFoam = subprocess.Popen(['paraFoam', '-builtin', '-touch'], cwd=self.USER_DIR)
+        toFoam = subprocess.Popen(['paraFoam', '-builtin', '-touch'], cwd=self.case.case_dir)
         toFoam.wait()
 
-        foam_file = self.USER_DIR + ".foam"
-        foam_path = os.path.join(self.USER_DIR, foam_file)
-
-        self.foam_reader = simple.OpenFOAMReader(FileName=foam_path)
+        self.foam_reader = self.proxies.track("results", simple.OpenFOAMReader(FileName=self.foam_path))
         self.foam_reader.MeshRegions = ['internalMesh']
         self.foam_reader.CellArrays = ['U']
-        airflow = simple.Show(self.foam_reader, self.view, 'UnstructuredGridRepresentation')
-        
-        simple.SetActiveSource(environment)
-        simple.SetActiveSource(airflow)
         animationScene = simple.GetAnimationScene()
-        animationScene.UpdateAnimationUsingDataTimeSteps()
 
-        airflow.ScaleTransferFunction.Points = [-4.672417163848877, 0.0, 0.5, 0.0, 4.776854038238525, 1.0, 0.5, 0.0]
-        airflow.OpacityTransferFunction.Points = [-4.672417163848877, 0.0, 0.5, 0.0, 4.776854038238525, 1.0, 0.5, 0.0]
-        simple.ColorBy(airflow, ('POINTS', 'U', 'Magnitude'))
-        airflow.RescaleTransferFunctionToDataRange(True, False)
-        airflow.SetScalarBarVisibility(self.view, True)
-        self.view.Update()
+        # slices sampled by the solver are shown as they are, without loading the volume
+        self.samples = self.sample_times()
+        if not self.samples:
+            airflow = simple.Show(self.foam_reader, self.view, 'UnstructuredGridRepresentation')
+            
+            simple.SetActiveSource(environment)
+            simple.SetActiveSource(airflow)
+            animationScene.UpdateAnimationUsingDataTimeSteps()
+
+            airflow.ScaleTransferFunction.Points = [-4.672417163848877, 0.0, 0.5, 0.0, 4.776854038238525, 1.0, 0.5, 0.0]
+            airflow.OpacityTransferFunction.Points = [-4.672417163848877, 0.0, 0.5, 0.0, 4.776854038238525, 1.0, 0.5, 0.0]
+            simple.ColorBy(airflow, ('POINTS', 'U', 'Magnitude'))
+            airflow.RescaleTransferFunctionToDataRange(True, False)
+            airflow.SetScalarBarVisibility(self.view, True)
+            self.view.Update()
 
         uTF2D = simple.GetTransferFunction2D('U')
 
@@ -642,14 +629,27 @@ class Engine:
         uPWF.ScalarRangeInitialized = 1
 
         # Create slice
-        self.slice = simple.Slice(Input=self.foam_reader)
+        self.slice = self.proxies.track("results", simple.Slice(Input=self.foam_reader))
         self.slice.SliceType = 'Plane'
         self.slice.HyperTreeGridSlicer = 'Plane'
         self.slice.SliceOffsetValues = [0.0]
         self.slice.SliceType.Origin = [0.0, 0.0, 1.0]
         self.slice.SliceType.Normal = [0.0, 0.0, 1.0]
 
-        airflow_slice = simple.Show(self.slice, self.view, 'GeometryRepresentation')
+        # Show slices through a producer fed from the timeline cache
+        if self.samples:
+            self.timesteps = sorted(self.samples)
+        else:
+            self.timesteps = [float(t) for t in self.foam_reader.TimestepValues] or [0.0]
+        self.timeline = self.proxies.track("results", simple.PVTrivialProducer())
+        self.slice_cache.clear()
+        self.changeSim = True
+        with self.state:
+            self.state.timeCount = len(self.timesteps) - 1
+            self.state.timeIndex = len(self.timesteps) - 1
+        self.update_slice()
+
+        airflow_slice = simple.Show(self.timeline, self.view, 'GeometryRepresentation')
         airflow_slice.Representation = 'Surface'
         airflow_slice.ColorArrayName = ['POINTS', 'U']
         airflow_slice.LookupTable = uLUT
@@ -676,10 +676,11 @@ class Engine:
         airflow_slice.ScaleTransferFunction.Points = [-1.3226988315582275, 0.0, 0.5, 0.0, 1.0460031032562256, 1.0, 0.5, 0.0]
         airflow_slice.OpacityTransferFunction.Points = [-1.3226988315582275, 0.0, 0.5, 0.0, 1.0460031032562256, 1.0, 0.5, 0.0]
 
-        simple.Hide(self.foam_reader)
+        if not self.samples:
+            simple.Hide(self.foam_reader)
         
         uLUT.ApplyPreset('Turbo', True)
-        animationScene.AnimationTime = float(self.simTime)
+        animationScene.AnimationTime = self.timesteps[-1]
 
         airflow_slice.SetScalarBarVisibility(self.view, True)
         airflow_slice.RescaleTransferFunctionToDataRange(False, True)
@@ -689,7 +690,6 @@ class Engine:
         self.ctrl.view_reset_camera()
         self.ctrl.view_update()
         
-        self.changeSim = True
         self.update_simProgress(15)
     
     def update_simProgress(self, delta):
@@ -698,9 +698,19 @@ class Engine:
 
     @asynchronous.task
     async def _async_simulate(self, **kwargs):
-        self.simplefoam()
-        await asyncio.sleep(0.05)
+        try:
+            await self.case.run_simulation(lambda stage, seconds: self.update_simProgress(stage.progress))
+        except Exception as error:
+            logger.error("Simulation failed: %s", error)
+            with self.state:
+                self.state.errorMessage = str(error)
+                self.state.sim_running = False
+            return
+        self.state.downloadUrl = "download/{0}".format(self.case.case_id)
         self.view_foam()
+        self.render_thumbnails()
+        self.list_cases(self.state.casePage)
+        self.report_memory()
         await asyncio.sleep(0.05)
         with self.state:
             self.state.postProcessing = False
@@ -708,8 +718,11 @@ class Engine:
     
     async def run_sim(self, **kwargs):
         if not self.state.sim_running:
-            self.removeHistory()
+            self.writable_case()
+            self.update_case("running")
+            self.case.clear_results()
             self.state.simProgress = 0
+            self.state.errorMessage = ""
             await asyncio.sleep(0.01)
             self.state.sim_running = True
             self.state.postProcessing = True
@@ -718,12 +731,291 @@ class Engine:
             asynchronous.create_task(self._async_simulate())
 
     def set_slicePos(self, slicePos, **kwargs):
-        if self.state.postProcessing == True:
+        if self.state.postProcessing == True or not self.changeSim:
             return
         else:
-            self.slice.SliceType.Origin = [0.0, 0.0, float(slicePos)]
+            self.update_slice()
             self.ctrl.view_update()
-        
+
+    def set_timeIndex(self, timeIndex, **kwargs):
+        if self.state.postProcessing == True or not self.changeSim:
+            return
+        self.update_slice()
+        self.update_streamlines()
+        self.ctrl.view_update()
+
+    def update_streamlines(self, **kwargs):
+        if self.state.postProcessing == True or not self.changeSim:
+            return
+        if not self.state.showStreamlines:
+            if self.streamlines is not None:
+                simple.Hide(self.streamlines, self.view)
+                self.ctrl.view_update()
+            return
+
+        # build the locator once per displayed result and time step
+        t = self.timesteps[min(int(self.state.timeIndex or 0), len(self.timesteps) - 1)]
+        if self.tracer is None or self.tracer_time != t:
+            self.foam_reader.UpdatePipeline(t)
+            self.tracer = StreamlineTracer(servermanager.Fetch(self.foam_reader))
+            self.tracer_time = t
+
+        start = time.perf_counter()
+        center = [float(self.state.seedX) * self.case.length, float(self.state.seedY) * self.case.width, \
+                  float(self.state.seedZ) * self.case.height]
+        lines = self.tracer.trace(self.state.seedType, center, self.state.seedCount, \
+                                  float(self.state.seedSize) * 2 * self.case.length, self.state.maxSteps)
+        if self.streamlines is None:
+            self.streamlines = self.proxies.track("results", simple.PVTrivialProducer())
+            self.streamlines.GetClientSideObject().SetOutput(lines)
+            display = simple.Show(self.streamlines, self.view, 'GeometryRepresentation')
+            display.ColorArrayName = ['POINTS', 'U']
+            display.LookupTable = simple.GetColorTransferFunction('U')
+            display.LineWidth = 2.0
+        else:
+            self.streamlines.GetClientSideObject().SetOutput(lines)
+            self.streamlines.MarkModified(self.streamlines)
+            simple.Show(self.streamlines, self.view)
+        logger.info("Traced %s streamlines in %.3fs", lines.GetNumberOfCells(), time.perf_counter() - start)
+        self.ctrl.view_update()
+
+    def update_slice(self):
+        index = min(int(self.state.timeIndex or 0), len(self.timesteps) - 1)
+        t = self.timesteps[index]
+        data = self.slice_data(t, float(self.state.slicePos or 1.0))
+        self.timeline.GetClientSideObject().SetOutput(data)
+        self.timeline.MarkModified(self.timeline)
+        self.timeline.UpdatePipeline(t)
+        simple.GetAnimationScene().AnimationTime = t
+        self.state.timeValue = t
+
+    def slice_data(self, t, z):
+        # reuse the slice of a timestep and height when it was already extracted
+        if self.samples:
+            z = min(slice_heights(self.case.height), key=lambda h: abs(h - z))
+        key = (self.case.case_id, t, round(z, 3))
+        data = self.slice_cache.get(key)
+        if data is None:
+            if self.samples:
+                data = self.read_sample(t, z)
+            else:
+                self.slice.SliceType.Origin = [0.0, 0.0, z]
+                self.slice.UpdatePipeline(t)
+                data = servermanager.Fetch(self.slice)
+            self.slice_cache.put(key, data, data.GetActualMemorySize() * 1024)
+        return data
+
+    def render_thumbnails(self):
+        # render the displayed run once into images kept with its case, shown by the gallery
+        try:
+            if self.thumbnail_view is None:
+                self.thumbnail_view = simple.CreateView('RenderView')
+                self.thumbnail_view.OrientationAxesVisibility = 0
+                simple.SetActiveView(self.view)
+            view = self.thumbnail_view
+            view.ViewSize = THUMBNAIL_SIZE
+            os.makedirs(os.path.join(self.case.case_dir, THUMBNAIL_DIR), exist_ok=True)
+
+            # the slice at the default height of the last time step, seen from above
+            # a shallow copy, the cached slice may be the output of the timeline already
+            data = self.slice_data(self.timesteps[-1], THUMBNAIL_SLICE_HEIGHT)
+            copy = data.NewInstance()
+            copy.ShallowCopy(data)
+            producer = self.proxies.track("thumbnail", simple.PVTrivialProducer())
+            producer.GetClientSideObject().SetOutput(copy)
+            producer.UpdatePipeline()
+            airflow = simple.Show(producer, view, 'GeometryRepresentation')
+            simple.ColorBy(airflow, ('POINTS', 'U', 'Magnitude'))
+            airflow.LookupTable = simple.GetColorTransferFunction('U')
+            view.CameraPosition = [0.0, 0.0, 1.0]
+            view.CameraFocalPoint = [0.0, 0.0, 0.0]
+            view.CameraViewUp = [0.0, 1.0, 0.0]
+            view.ResetCamera()
+            simple.SaveScreenshot(thumbnail_path(self.case.case_dir, "slice"), view, ImageResolution=THUMBNAIL_SIZE)
+
+            # the geometry over the slice, seen from a corner
+            for reader in self.stl_readers.values():
+                simple.Show(reader, view, 'GeometryRepresentation')
+            view.CameraPosition = [1.0, -1.0, 1.0]
+            view.CameraViewUp = [0.0, 0.0, 1.0]
+            view.ResetCamera()
+            simple.SaveScreenshot(thumbnail_path(self.case.case_dir, "overview"), view, ImageResolution=THUMBNAIL_SIZE)
+        except Exception as error:
+            logger.warning("Rendering the thumbnails of case %s failed: %s", self.case.case_id, error)
+            return
+        finally:
+            # the view is kept for the next run, nothing shown in it is
+            if self.thumbnail_view is not None:
+                for reader in self.stl_readers.values():
+                    simple.Hide(reader, self.thumbnail_view)
+            self.proxies.release("thumbnail")
+        self.update_case("completed", artifacts=self.case.artifacts())
+
+    def sample_times(self):
+        # time directories of the slices sampled by the solver, none for the full output profile
+        root = os.path.join(self.case.case_dir, 'postProcessing', SAMPLES_DIR)
+        samples = dict()
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                try:
+                    samples[float(name)] = name
+                except ValueError:
+                    continue
+        return samples
+
+    def read_sample(self, t, z):
+        pattern = os.path.join(self.case.case_dir, 'postProcessing', SAMPLES_DIR, self.samples[t], \
+                               '*{0}*.vtk'.format(surface_name(z)))
+        paths = glob.glob(pattern)
+        if not paths:
+            raise FileNotFoundError("No sampled slice matches {0}".format(pattern))
+        reader = vtkPolyDataReader()
+        reader.SetFileName(paths[0])
+        reader.Update()
+        return reader.GetOutput()
+
+    # Methods for comparing runs
+    def compare(self, **kwargs):
+        # show two completed runs side by side with the change of velocity between them
+        cases = [Case.open(self.registry, self.executor, case_id) \
+                 for case_id in [self.state.compareA, self.state.compareB]]
+        if any(case is None or case.status != "completed" for case in cases):
+            logger.warning("Cases %s and %s cannot be compared", self.state.compareA, self.state.compareB)
+            return
+        try:
+            bounds = shared_bounds(run_bounds(cases[0]), run_bounds(cases[1]))
+        except ValueError as error:
+            self.state.errorMessage = str(error)
+            return
+
+        dims = grid_dims(bounds)
+        a, b = [self.resample(case, bounds, dims) for case in cases]
+        delta, speed = difference(a, b)
+        self.release_comparison()
+        self.comparison = {
+            "bounds": bounds,
+            "dims": dims,
+            "arrays": [[("U", a)], [("U", b)], [("dU", delta), ("dSpeed", speed)]],
+        }
+
+        if not self.compare_views:
+            self.create_compare_views()
+
+        # the slices are fed to producers, one per view, colored like the results of a single run
+        uLUT = simple.GetColorTransferFunction('U')
+        dLUT = simple.GetColorTransferFunction('dSpeed')
+        dLUT.ApplyPreset('Cool to Warm', True)
+        dLUT.RescaleTransferFunction(*symmetric_range(speed))
+        for i, view in enumerate(self.compare_views):
+            producer = self.proxies.track("comparison", simple.PVTrivialProducer())
+            self.compare_producers.append(producer)
+            self.update_compare_slice(i)
+            display = simple.Show(producer, view, 'GeometryRepresentation')
+            if i < 2:
+                simple.ColorBy(display, ('POINTS', 'U', 'Magnitude'))
+                display.LookupTable = uLUT
+                # the buildings of each run in its own view
+                save_path = os.path.join(cases[i].case_dir, 'constant', 'triSurface')
+                for file in cases[i].files:
+                    reader = self.proxies.track("comparison", \
+                                                simple.STLReader(FileNames=[os.path.join(save_path, file)]))
+                    simple.Show(reader, view, 'GeometryRepresentation').Opacity = 0.4
+            else:
+                simple.ColorBy(display, ('POINTS', 'dSpeed'))
+                display.LookupTable = dLUT
+            display.SetScalarBarVisibility(view, True)
+        simple.ResetCamera(self.compare_views[0])
+
+        with self.state:
+            self.state.compareTitles = [
+                "A: {0}".format(self.case_title(self.registry.get(cases[0].case_id))),
+                "B: {0}".format(self.case_title(self.registry.get(cases[1].case_id))),
+                "B - A: change of speed [m/s]",
+            ]
+            self.state.compareMode = True
+        self.update_compare_views()
+
+    def create_compare_views(self):
+        # run A, run B and their difference, most sessions never compare and do without them
+        self.compare_views = [simple.CreateView('RenderView') for _ in range(3)]
+        for i, view in enumerate(self.compare_views[1:]):
+            simple.AddCameraLink(self.compare_views[0], view, "compare{0}".format(i))
+        simple.SetActiveView(self.view)
+        # the remote views of the new render views
+        self.ui()
+
+    def resample(self, case, bounds, dims):
+        # resample the last time step of a run onto the shared grid once, later comparisons reuse it
+        key = (case.case_id, tuple(bounds), tuple(dims))
+        grid = self.grid_cache.get(key)
+        if grid is not None:
+            return grid
+
+        if not os.path.exists(case.foam_path):
+            toFoam = subprocess.Popen(['paraFoam', '-builtin', '-touch'], cwd=case.case_dir)
+            toFoam.wait()
+        reader = self.proxies.track("resample", simple.OpenFOAMReader(FileName=case.foam_path))
+        reader.MeshRegions = ['internalMesh']
+        reader.CellArrays = ['U']
+        reader.UpdatePipelineInformation()
+        timesteps = [float(t) for t in reader.TimestepValues] or [0.0]
+        resampled = self.proxies.track("resample", simple.ResampleToImage(Input=reader))
+        resampled.UseInputBounds = 0
+        resampled.SamplingBounds = bounds
+        resampled.SamplingDimensions = dims
+        resampled.UpdatePipeline(timesteps[-1])
+        image = servermanager.Fetch(resampled)
+        # only the arrays are kept, the mesh of the run is released right away
+        self.proxies.release("resample")
+
+        point_data = image.GetPointData()
+        grid = velocity_grid(vtk_to_numpy(point_data.GetArray('U')), \
+                             vtk_to_numpy(point_data.GetArray('vtkValidPointMask')), dims)
+        self.grid_cache.put(key, grid, grid.nbytes)
+        logger.info("Resampled case %s onto a %s grid", case.case_id, dims)
+        return grid
+
+    def update_compare_slice(self, i):
+        # one layer of the shared grid, no interpolation between the meshes of the runs
+        bounds = self.comparison["bounds"]
+        dims = self.comparison["dims"]
+        k = slice_index(float(self.state.compareSlicePos or 1.0), bounds, dims)
+        spacing = grid_spacing(bounds, dims)
+        image = vtkImageData()
+        image.SetDimensions(dims[0], dims[1], 1)
+        image.SetOrigin(bounds[0], bounds[2], bounds[4] + k * spacing[2])
+        image.SetSpacing(spacing[0], spacing[1], 1.0)
+        for name, grid in self.comparison["arrays"][i]:
+            array = numpy_to_vtk(plane(grid, k), deep=1)
+            array.SetName(name)
+            image.GetPointData().AddArray(array)
+        producer = self.compare_producers[i]
+        producer.GetClientSideObject().SetOutput(image)
+        producer.MarkModified(producer)
+        producer.UpdatePipeline()
+
+    def update_compare_slices(self, **kwargs):
+        if not self.state.compareMode or self.comparison is None:
+            return
+        for i in range(len(self.compare_producers)):
+            self.update_compare_slice(i)
+        self.update_compare_views()
+
+    def update_compare_views(self, *args, **kwargs):
+        # the cameras are linked, the views that were not dragged still need new images
+        for update in self.compare_updates:
+            update()
+
+    def release_comparison(self):
+        self.proxies.release("comparison")
+        self.compare_producers = []
+        self.comparison = None
+
+    def close_compare(self, **kwargs):
+        self.release_comparison()
+        self.state.compareMode = False
+        self.ctrl.view_update()
+
     # Selection Change
     def actives_change(self, ids):
         _id = ids[0]
@@ -731,6 +1023,8 @@ class Engine:
             self._server.state.active_ui = "environment"
         elif _id == "2":  # Simulate Airflow
             self._server.state.active_ui = "airflow"
+        elif _id == "3":  # Saved Cases
+            self._server.state.active_ui = "cases"
         else:
             self._server.state.active_ui = "nothing"
 
@@ -741,6 +1035,7 @@ class Engine:
                 [
                     {"id": "1", "parent": "0", "visible": 1, "name": "Set Environment"},
                     {"id": "2", "parent": "1", "visible": 1, "name": "Simulate Airflow"},
+                    {"id": "3", "parent": "0", "visible": 1, "name": "Saved Cases"},
                 ],
             ),
             actives_change=(self.actives_change, "[$event]"),
@@ -856,7 +1151,7 @@ class Engine:
                 with vuetify.VCol(classes="text-center", cols="12"):
                     vuetify.VBtn(
                         "Set",
-                        click=self.run_set,
+                        click="trigger('run_set')",
                         disabled=("set_running", True),
                         variant="tonal",
                         classes="pa-3"
@@ -927,11 +1222,57 @@ class Engine:
                 suffix="seconds",
                 classes="ma-2"
                 )
+            vuetify.VTextField(
+                label="Snapshots",
+                v_model=("mySnapshots", 1),
+                hint="Number of time steps kept for playback",
+                classes="ma-2"
+                )
+            vuetify.VSelect(
+                # Output profile
+                v_model=("outputProfile", "full"),
+                items=(
+                    "outputProfiles",
+                    [
+                        {"text": "full volume output", "value": "full"},
+                        {"text": "lean output with sampled slices", "value": "lean"},
+                    ],
+                ),
+                label="output",
+                hide_details=True,
+                dense=True,
+                outlined=True,
+                classes="ma-2",
+            )
+            vuetify.VSelect(
+                # Solver preset
+                v_model=("solverPreset", "balanced"),
+                items=(
+                    "solverPresets",
+                    [
+                        {"text": "fast", "value": "fast"},
+                        {"text": "balanced", "value": "balanced"},
+                        {"text": "accurate", "value": "accurate"},
+                    ],
+                ),
+                label="solver",
+                hide_details=True,
+                dense=True,
+                outlined=True,
+                classes="ma-2",
+            )
+            vuetify.VCheckbox(
+                label="Initialize with potential flow",
+                v_model=("potentialInit", True),
+                dense=True,
+                hide_details=True,
+                classes="ma-2"
+            )
             with vuetify.VRow(classes="pt-1", align="center", dense=True):
                 with vuetify.VCol(classes="text-center", cols="12"):
                     vuetify.VBtn(
                         "Simulate",
-                        click=self.run_sim,
+                        click="trigger('run_sim')",
                         disabled=("sim_running", True),
                         variant="tonal",
                         classes="mb-2"
@@ -955,12 +1296,171 @@ class Engine:
                     disabled=("postProcessing", True),
                     classes = "pa-2"
                 )
+            with vuetify.VRow(classes="pt-1", align="center", dense=True):
+                with vuetify.VCol(classes="text-center", cols="12"):
+                    vuetify.VBtn(
+                        "Download Results",
+                        href=("downloadUrl", ""),
+                        disabled=("!downloadUrl",),
+                        variant="tonal",
+                        classes="mb-2"
+                    )
+            vuetify.VCardSubtitle("Time {{ timeValue }} s")
+            vuetify.VSlider(
+                    label="Time step",
+                    v_model=("timeIndex", 0),
+                    min=0, max=("timeCount", 0), step=1,
+                    dense=True, hide_details=True,
+                    disabled=("postProcessing", True),
+                    classes = "pa-2"
+                )
+            vuetify.VDivider(classes="mt-3")
+            vuetify.VSwitch(
+                label="Streamlines",
+                v_model=("showStreamlines", False),
+                disabled=("postProcessing", True),
+                dense=True,
+                hide_details=True,
+                classes="ma-2"
+            )
+            with vuetify.VCard(v_show="showStreamlines", flat=True):
+                vuetify.VSelect(
+                    # Seed
+                    v_model=("seedType", "line"),
+                    items=(
+                        "seedTypes",
+                        [
+                            {"text": "line", "value": "line"},
+                            {"text": "point", "value": "point"},
+                        ],
+                    ),
+                    label="seed",
+                    hide_details=True,
+                    dense=True,
+                    outlined=True,
+                    classes="ma-2",
+                )
+                vuetify.VSlider(
+                    label="Seed x",
+                    v_model=("seedX", 0),
+                    min=-1, max=1, step=0.01,
+                    dense=True, hide_details=True,
+                    classes="pa-2"
+                )
+                vuetify.VSlider(
+                    label="Seed y",
+                    v_model=("seedY", 0),
+                    min=-1, max=1, step=0.01,
+                    dense=True, hide_details=True,
+                    classes="pa-2"
+                )
+                vuetify.VSlider(
+                    label="Seed z",
+                    v_model=("seedZ", 0.2),
+                    min=0, max=1, step=0.01,
+                    dense=True, hide_details=True,
+                    classes="pa-2"
+                )
+                vuetify.VSlider(
+                    label="Seed size",
+                    v_model=("seedSize", 0.5),
+                    min=0.01, max=1, step=0.01,
+                    dense=True, hide_details=True,
+                    classes="pa-2"
+                )
+                vuetify.VSlider(
+                    label="Seeds",
+                    v_model=("seedCount", 20),
+                    min=1, max=MAX_SEEDS, step=1,
+                    dense=True, hide_details=True,
+                    thumb_label=True,
+                    classes="pa-2"
+                )
+                vuetify.VSlider(
+                    label="Steps",
+                    v_model=("maxSteps", 500),
+                    min=10, max=MAX_STEPS, step=10,
+                    dense=True, hide_details=True,
+                    thumb_label=True,
+                    classes="pa-2"
+                )
             vuetify.VAlert(
                 "The simulation will not run if there is no environment set and there are negative inputs.",
                 type="warning",
                 classes="ma-2"
             )
 
+    def cases_control_panel(self):
+        with self.ui_card(title="Saved Cases", \
+                          text="Open a completed simulation without running it again", \
+                            ui_name="cases"):
+            # thumbnails are plain images, the result is only loaded when one is clicked
+            with vuetify.VCard(
+                v_for="item in cases",
+                key="item.id",
+                outlined=True,
+                classes="ma-2",
+            ):
+                with vuetify.VRow(v_if="item.thumbnails", dense=True, classes="pa-1"):
+                    with vuetify.VCol(v_for="(url, name) in item.thumbnails", key="name", cols="6"):
+                        vuetify.VImg(
+                            src=("url",),
+                            aspect_ratio=THUMBNAIL_SIZE[0] / THUMBNAIL_SIZE[1],
+                            style="cursor: pointer",
+                            click=(self.open_case, "[item.id]"),
+                        )
+                with vuetify.VListItem(click=(self.open_case, "[item.id]"), dense=True):
+                    with vuetify.VListItemContent():
+                        vuetify.VListItemTitle("{{ item.title }}")
+                        vuetify.VListItemSubtitle("{{ item.subtitle }}")
+                        vuetify.VListItemSubtitle("{{ item.metrics }}")
+            vuetify.VPagination(
+                v_model=("casePage", 1),
+                length=("casePages", 1),
+                total_visible=5,
+                classes="ma-2"
+            )
+            vuetify.VDivider(classes="mt-3")
+            vuetify.VCardSubtitle("Compare two runs of this page side by side")
+            for run in ["A", "B"]:
+                vuetify.VSelect(
+                    v_model=("compare{0}".format(run), None),
+                    items=("cases",),
+                    item_text="title",
+                    item_value="id",
+                    label="run {0}".format(run),
+                    hide_details=True,
+                    dense=True,
+                    outlined=True,
+                    classes="ma-2",
+                )
+            with vuetify.VRow(classes="pt-1", align="center", dense=True):
+                with vuetify.VCol(classes="text-center", cols="6"):
+                    vuetify.VBtn(
+                        "Compare",
+                        click=self.compare,
+                        disabled=("!compareA || !compareB || compareA == compareB",),
+                        variant="tonal",
+                        classes="mb-2"
+                    )
+                with vuetify.VCol(classes="text-center", cols="6"):
+                    vuetify.VBtn(
+                        "Close",
+                        click=self.close_compare,
+                        disabled=("!compareMode",),
+                        variant="tonal",
+                        classes="mb-2"
+                    )
+            vuetify.VSlider(
+                    label="Height [m]",
+                    v_model=("compareSlicePos", 1),
+                    min=0.1, max=10, step=0.1,
+                    dense=True, hide_details=True,
+                    thumb_label=True,
+                    disabled=("!compareMode",),
+                    classes = "pa-2"
+                )
+
     def ui(self, *args, **kwargs):
         with SinglePageWithDrawerLayout(self._server) as layout:
             #layout.icon.click = self.ctrl.view_reset_camera
@@ -973,16 +1473,44 @@ class Engine:
                 vuetify.VDivider(classes="mb-2")
                 self.environment_control_panel()
                 self.simulation_control_panel()
+                self.cases_control_panel()
+                vuetify.VAlert(
+                    "{{ errorMessage }}",
+                    v_show=("errorMessage", ""),
+                    type="error",
+                    dense=True,
+                    classes="ma-2"
+                )
 
             with layout.content:
                 with vuetify.VContainer(
                     fluid=True,
                     classes="pa-0 fill-height",
+                    v_show="!compareMode",
                 ):
                     html_view = paraview.VtkRemoteView(self.view)
                     self.ctrl.view_update = html_view.update
                     self.ctrl.view_reset_camera = html_view.reset_camera
 
+                # Compare mode, the cameras of the views are linked
+                with vuetify.VContainer(
+                    fluid=True,
+                    classes="pa-0 fill-height",
+                    v_show=("compareMode", False),
+                ):
+                    self.compare_updates = []
+                    with vuetify.VRow(no_gutters=True, classes="fill-height"):
+                        for i, view in enumerate(self.compare_views):
+                            with vuetify.VCol(cols="4", classes="d-flex flex-column fill-height"):
+                                vuetify.VSubheader("{{{{ compareTitles[{0}] }}}}".format(i), v_if="compareTitles")
+                                with vuetify.VCard(flat=True, classes="flex-grow-1"):
+                                    compare_view = paraview.VtkRemoteView(
+                                        view,
+                                        interactor_events=("events", ["EndAnimation"]),
+                                        EndAnimation=self.update_compare_views,
+                                    )
+                                    self.compare_updates.append(compare_view.update)
+
                 # Footer
                 # layout.footer.hide()
 
@@ -0,0 +1,172 @@
+"""
+Streaming download of case files as zip or tar archives
+
+Archives are written by a worker thread straight from disk into a small
+bounded queue that the aiohttp handler drains to the client, so memory per
+download stays at a few chunks whatever the case size and the event loop is
+never blocked by compression or file reads.
+
+    GET /download/<case_id>?format=zip|tar&fields=U,p&parts=mesh,fields,logs,metrics
+"""
+import os
+import asyncio
+import tarfile
+import zipfile
+
+from aiohttp import web
+
+from .foam import latest_time
+
+
+CHUNK_SIZE = 1 << 20
+QUEUE_CHUNKS = 4
+PARTS = ["mesh", "fields", "logs", "metrics"]
+FORMATS = {
+    "zip": ("application/zip", "zip"),
+    "tar": ("application/gzip", "tar.gz"),
+}
+
+
+def walk(case_dir, relative):
+    root = os.path.join(case_dir, relative)
+    if os.path.isfile(root):
+        yield relative
+        return
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(dirpath, name), case_dir)
+
+
+def case_files(case_dir, parts=PARTS, fields=None):
+    """Return the paths, relative to case_dir, of the requested parts of a case"""
+    files = []
+    if "mesh" in parts:
+        files += walk(case_dir, os.path.join('constant', 'polyMesh'))
+    if "fields" in parts:
+        time = latest_time(case_dir)
+        if time is not None:
+            for path in walk(case_dir, time):
+                if fields is None or os.path.basename(path) in fields:
+                    files.append(path)
+    if "logs" in parts:
+        files += walk(case_dir, 'logs')
+    if "metrics" in parts and os.path.exists(os.path.join(case_dir, 'metadata.json')):
+        files.append('metadata.json')
+    return files
+
+
+class QueueWriter:
+    """Write-only file object handing chunks over to the event loop"""
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.buffer = bytearray()
+        self.cancelled = False
+
+    def put(self, chunk):
+        if self.cancelled:
+            raise ConnectionAbortedError("Download cancelled")
+        asyncio.run_coroutine_threadsafe(self.queue.put(chunk), self.loop).result()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            chunk, self.buffer = bytes(self.buffer), bytearray()
+            self.put(chunk)
+
+    def close(self):
+        self.flush()
+        self.put(None)
+
+
+def write_archive(fmt, case_dir, prefix, files, writer):
+    try:
+        if fmt == "zip":
+            with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+                for path in files:
+                    info = zipfile.ZipInfo.from_file(os.path.join(case_dir, path), os.path.join(prefix, path))
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with open(os.path.join(case_dir, path), "rb") as fr, \
+                            archive.open(info, "w", force_zip64=True) as fw:
+                        while True:
+                            chunk = fr.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            fw.write(chunk)
+        else:
+            with tarfile.open(fileobj=writer, mode="w|gz") as archive:
+                for path in files:
+                    archive.add(os.path.join(case_dir, path), arcname=os.path.join(prefix, path))
+    finally:
+        if not writer.cancelled:
+            writer.close()
+
+
+async def stream_archive(request, case_id, case_dir, fmt="zip", parts=PARTS, fields=None):
+    loop = asyncio.get_running_loop()
+    files = await loop.run_in_executor(None, case_files, case_dir, parts, fields)
+    content_type, extension = FORMATS[fmt]
+
+    response = web.StreamResponse(headers={
+        "Content-Type": content_type,
+        "Content-Disposition": 'attachment; filename="{0}.{1}"'.format(case_id, extension),
+    })
+    await response.prepare(request)
+
+    queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+    writer = QueueWriter(loop, queue)
+    task = loop.run_in_executor(None, write_archive, fmt, case_dir, case_id, files, writer)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            await response.write(chunk)
+    except (ConnectionResetError, asyncio.CancelledError):
+        # stop the writer and unblock its pending put
+        writer.cancelled = True
+        while not queue.empty():
+            queue.get_nowait()
+        raise
+    finally:
+        if writer.cancelled:
+            while not task.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            # the writer stopped on ConnectionAbortedError, retrieve it so that it is not logged as unhandled
+            if not task.cancelled():
+                task.exception()
+    await task
+    await response.write_eof()
+    return response
+
+
+def archive_options(request):
+    """Return the format, parts and fields of an archive from the query of a request"""
+    fmt = request.query.get("format", "zip")
+    if fmt not in FORMATS:
+        raise web.HTTPBadRequest(text="Format must be one of {0}".format(", ".join(FORMATS)))
+    parts = request.query.get("parts")
+    parts = PARTS if parts is None else [part for part in parts.split(",") if part in PARTS]
+    fields = request.query.get("fields")
+    fields = None if fields is None else set(fields.split(","))
+    return fmt, parts, fields
+
+
+def add_routes(app, registry):
+    async def download(request):
+        case_id = request.match_info["case_id"]
+        case = registry.get(case_id)
+        if case is None or not os.path.isdir(case["case_dir"]):
+            raise web.HTTPNotFound(text="Unknown case {0}".format(case_id))
+        return await stream_archive(request, case_id, case["case_dir"], *archive_options(request))
+
+    app.router.add_get("/download/{case_id}", download)
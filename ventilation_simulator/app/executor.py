@@ -0,0 +1,185 @@
+"""
+Execution backends that run the OpenFOAM commands of a case
+
+Every backend exposes the same ``run(cmd, cwd, log_path, nprocs=None)``
+method, so the engine does not need to know whether a solve happens on the
+web node, across several MPI hosts or on a batch scheduler. Commands given
+``nprocs`` are parallel OpenFOAM applications and get wrapped with ``mpirun``.
+"""
+import os
+import re
+import abc
+import shlex
+import subprocess
+import time
+import logging
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+EXECUTORS = ["local", "hostfile", "batch"]
+
+
+class Executor(abc.ABC):
+    def command(self, cmd, nprocs=None):
+        if nprocs is None:
+            return list(cmd)
+        return ["mpirun", "-np", str(nprocs)] + list(cmd) + ["-parallel"]
+
+    @abc.abstractmethod
+    def run(self, cmd, cwd, log_path, nprocs=None):
+        """Run cmd in cwd with its output in log_path and return its exit code"""
+
+
+class LocalExecutor(Executor):
+    """Run every command on this machine (the original behaviour)"""
+
+    def run(self, cmd, cwd, log_path, nprocs=None):
+        with open(log_path, "w", encoding="utf-8") as log:
+            process = subprocess.Popen(
+                self.command(cmd, nprocs), cwd=cwd, stdout=log, stderr=subprocess.STDOUT
+            )
+            process.wait()
+        return process.returncode
+
+
+class HostfileExecutor(LocalExecutor):
+    """Spread the MPI ranks of parallel commands over the hosts of a hostfile
+
+    The case directory must be reachable under the same path on every host,
+    e.g. through a shared file system.
+    """
+
+    def __init__(self, hostfile):
+        if not os.path.isfile(hostfile):
+            raise FileNotFoundError("MPI hostfile not found: {0}".format(hostfile))
+        self.hostfile = os.path.abspath(hostfile)
+
+    def command(self, cmd, nprocs=None):
+        if nprocs is None:
+            return list(cmd)
+        return ["mpirun", "--hostfile", self.hostfile, "-np", str(nprocs)] \
+            + list(cmd) + ["-parallel"]
+
+
+class BatchExecutor(Executor):
+    """Submit every command as an sbatch-style job script and wait for it
+
+    The job script writes its exit code to ``<log_path>.done`` which is polled,
+    so any submit command that eventually runs the script works, including a
+    plain ``sh`` for testing. While the marker is missing the scheduler is
+    asked for the state of the job with ``status`` followed by the job id, so
+    jobs cancelled or killed before writing the marker fail instead of being
+    waited for forever. The scheduler writes its own output to
+    ``<log_path>.out``, next to the output of the command.
+    """
+
+    JOB_ID_PATTERN = re.compile(r"(\d+)")
+
+    # Scheduler states of jobs that ended without running the script to its end
+    FAILED_STATES = ["BOOT_FAIL", "CANCELLED", "DEADLINE", "FAILED", "NODE_FAIL", "OUT_OF_MEMORY", \
+                     "PREEMPTED", "TIMEOUT"]
+
+    # Polls without the job in the queue nor a marker before the job counts as lost,
+    # leaving time for the marker to show up on a shared file system
+    LOST_POLLS = 3
+
+    def __init__(self, submit="sbatch", poll_interval=5.0, timeout=None, status="squeue -h -o %T -j"):
+        self.submit = shlex.split(submit) if isinstance(submit, str) else list(submit)
+        self.status = shlex.split(status) if isinstance(status, str) else list(status or [])
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def script(self, cmd, cwd, log_path, nprocs=None):
+        done_path = log_path + ".done"
+        name = os.path.basename(log_path)
+        lines = [
+            "#!/bin/sh\n",
+            "#SBATCH --job-name={0}\n".format(name),
+            "#SBATCH --ntasks={0}\n".format(nprocs or 1),
+            "#SBATCH --output={0}.out\n".format(log_path),
+            "cd {0}\n".format(shlex.quote(os.path.abspath(cwd))),
+            "{0} > {1} 2>&1\n".format(shlex.join(self.command(cmd, nprocs)), shlex.quote(log_path)),
+            "echo $? > {0}\n".format(shlex.quote(done_path)),
+        ]
+        return lines
+
+    def run(self, cmd, cwd, log_path, nprocs=None):
+        log_path = os.path.abspath(log_path)
+        done_path = log_path + ".done"
+        script_path = log_path + ".sh"
+        if os.path.exists(done_path):
+            os.remove(done_path)
+
+        with open(script_path, "w", encoding="utf-8") as fw:
+            fw.writelines(self.script(cmd, cwd, log_path, nprocs))
+
+        returncode, job_id = self.submit_job(script_path, cwd)
+        if returncode != 0:
+            return returncode
+        logger.info("Submitted %s as job %s", os.path.basename(log_path), job_id)
+
+        start = time.monotonic()
+        lost = 0
+        while not os.path.exists(done_path):
+            if self.timeout is not None and time.monotonic() - start > self.timeout:
+                logger.error("Job %s timed out", job_id)
+                return -1
+            state = self.job_state(job_id)
+            if state in self.FAILED_STATES:
+                logger.error("Job %s ended as %s", job_id, state)
+                return -1
+            lost = lost + 1 if state == "" else 0
+            if lost > self.LOST_POLLS:
+                logger.error("Job %s left the queue without an exit code", job_id)
+                return -1
+            time.sleep(self.poll_interval)
+
+        # the marker may be seen before the exit code is flushed to it
+        code = ""
+        while not code:
+            with open(done_path, "r", encoding="utf-8") as fr:
+                code = fr.read().strip()
+            if not code:
+                time.sleep(0.01)
+        return int(code)
+
+    def submit_job(self, script_path, cwd):
+        """Submit a job script, return the exit code of the submission and the id of the job"""
+        submitted = subprocess.run(
+            self.submit + [script_path], cwd=cwd, capture_output=True, text=True
+        )
+        if submitted.returncode != 0:
+            logger.error("Job submission failed: %s", submitted.stderr.strip())
+            return submitted.returncode, None
+        match = self.JOB_ID_PATTERN.search(submitted.stdout)
+        return 0, match.group(1) if match else None
+
+    def job_state(self, job_id):
+        # state reported by the scheduler, "" once the job left the queue, None when it is unknown
+        if job_id is None or not self.status:
+            return None
+        try:
+            result = subprocess.run(self.status + [job_id], capture_output=True, text=True)
+        except OSError as error:
+            logger.warning("Cannot ask the scheduler for job %s: %s", job_id, error)
+            return None
+        # squeue fails on ids it already forgot
+        if result.returncode != 0:
+            return ""
+        lines = result.stdout.split()
+        return lines[0].strip().upper() if lines else ""
+
+
+def create_executor(name="local", hostfile=None, submit="sbatch", poll_interval=5.0, timeout=None, \
+                    status="squeue -h -o %T -j"):
+    if name == "local":
+        return LocalExecutor()
+    if name == "hostfile":
+        if hostfile is None:
+            raise ValueError("The hostfile executor needs --hostfile")
+        return HostfileExecutor(hostfile)
+    if name == "batch":
+        return BatchExecutor(submit=submit, poll_interval=poll_interval, timeout=timeout, status=status)
+    raise ValueError("Unknown executor: {0}".format(name))
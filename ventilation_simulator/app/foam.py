@@ -0,0 +1,57 @@
+"""
+Helpers to read the output of OpenFOAM applications
+"""
+import os
+import re
+
+
+TIME_PATTERN = re.compile(r"^Time = (\S+)")
+CONVERGED_PATTERN = re.compile(r"solution converged in (\d+) iterations")
+FAILED_PATTERN = re.compile(r"Failed (\d+) mesh checks")
+
+
+def parse_iterations(log_path):
+    """Return (iterations, converged) from the log of a steady-state solver"""
+    iterations = 0
+    converged = False
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as fr:
+            for line in fr:
+                match = TIME_PATTERN.match(line)
+                if match:
+                    iterations += 1
+                    continue
+                match = CONVERGED_PATTERN.search(line)
+                if match:
+                    iterations = int(match.group(1))
+                    converged = True
+    except FileNotFoundError:
+        return None, False
+    return iterations, converged
+
+
+def parse_check_mesh(log_path):
+    """Return (ok, messages) from the log of checkMesh, messages being its *** lines"""
+    ok = False
+    messages = []
+    with open(log_path, "r", encoding="utf-8", errors="replace") as fr:
+        for line in fr:
+            line = line.strip()
+            if line.startswith("***"):
+                messages.append(line.lstrip("* "))
+            elif line == "Mesh OK.":
+                ok = True
+            elif FAILED_PATTERN.match(line):
+                ok = False
+    return ok, messages
+
+
+def latest_time(case_dir):
+    """Return the name of the latest time directory of a case, or None"""
+    times = []
+    for name in os.listdir(case_dir):
+        try:
+            times.append((float(name), name))
+        except ValueError:
+            continue
+    return max(times)[1] if times else None
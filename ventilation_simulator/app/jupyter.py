@@ -1,5 +1,3 @@
-from .core import create_engine
-
 def jupyter_proxy_info():
     """Get the config to run the trame application via jupyter's server proxy
 
@@ -14,5 +12,7 @@ def jupyter_proxy_info():
 
 def show(server=None, **kwargs):
     """Show application into a Jupyter cell"""
+    from .core import create_engine
+
     app = create_engine(server)
     app.show_in_jupyter(**kwargs)
\ No newline at end of file
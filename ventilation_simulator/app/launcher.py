@@ -0,0 +1,249 @@
+"""
+Launcher keeping a pool of pre-warmed application processes
+
+Each worker imports ParaView, builds its Engine and render view and starts
+its trame server before any user arrives. The launcher routes every new
+session to an idle worker with a redirect, resets the worker when the last
+client of the session leaves and replaces it after ``--max-sessions``
+sessions so leaks do not accumulate. The time from routing a session to its
+first client connecting is reported as its time to interactive.
+
+    ventilation-simulator-launcher --port 8080 --pool-size 4 --data-dir ./data
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import time
+
+from aiohttp import web
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Seconds a routed session has to connect before its worker is handed out again
+CONNECT_TIMEOUT = 30
+
+
+class SessionClients:
+    """Clients connected to the session of a worker, the engine is reset when the last one leaves"""
+
+    def __init__(self, port, conn, reset):
+        self.port = port
+        self.conn = conn
+        self.reset = reset
+        self.count = 0
+
+    def connected(self, **kwargs):
+        self.count += 1
+        if self.count == 1:
+            self.conn.send(("connected", self.port))
+
+    def exited(self, **kwargs):
+        self.count = max(0, self.count - 1)
+        if self.count == 0:
+            self.reset()
+            self.conn.send(("released", self.port))
+
+
+def worker_main(port, conn, argv):
+    # runs in the worker process, everything heavy is imported here
+    import sys
+
+    sys.argv = ["ventilation-simulator"] + list(argv)
+
+    from trame.app import get_server
+    from .core import create_engine
+
+    server = get_server("worker-{0}".format(port))
+    engine = create_engine(server)
+    ctrl = server.controller
+
+    def on_ready(**kwargs):
+        conn.send(("ready", port))
+
+    clients = SessionClients(port, conn, engine.reset)
+    ctrl.on_server_ready.add(on_ready)
+    ctrl.on_client_connected.add(clients.connected)
+    ctrl.on_client_exited.add(clients.exited)
+    server.start(port=port, open_browser=False, show_connection_info=False, disable_logging=True, timeout=0)
+
+
+class Worker:
+    def __init__(self, port, argv):
+        self.port = port
+        self.conn, child_conn = multiprocessing.Pipe()
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=worker_main, args=(port, child_conn, argv), daemon=True)
+        self.process.start()
+        self.started = time.monotonic()
+        self.status = "starting"
+        self.sessions = 0
+        self.routed = None
+        self.interactive = None
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(5)
+        self.conn.close()
+
+
+class SessionPool:
+    def __init__(self, pool_size=2, max_workers=8, max_sessions=10, first_port=9000, argv=(), worker_class=Worker):
+        self.pool_size = pool_size
+        self.worker_class = worker_class
+        self.max_workers = max(max_workers, pool_size)
+        self.max_sessions = max_sessions
+        self.first_port = first_port
+        self.argv = list(argv)
+        self.workers = dict()
+        self.changed = asyncio.Event()
+
+    def free_port(self):
+        port = self.first_port
+        while port in self.workers:
+            port += 1
+        return port
+
+    def spawn(self):
+        worker = self.worker_class(self.free_port(), self.argv)
+        self.workers[worker.port] = worker
+        asyncio.get_running_loop().add_reader(worker.conn.fileno(), self.on_message, worker)
+        logger.info("Starting worker on port %s", worker.port)
+        return worker
+
+    def retire(self, worker):
+        asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+        del self.workers[worker.port]
+        worker.stop()
+        logger.info("Retired worker on port %s after %s sessions", worker.port, worker.sessions)
+
+    def on_message(self, worker):
+        try:
+            message, _ = worker.conn.recv()
+        except EOFError:
+            logger.warning("Worker on port %s exited", worker.port)
+            self.retire(worker)
+            self.fill()
+            return
+
+        if message == "ready":
+            logger.info("Worker on port %s ready in %.1fs", worker.port, time.monotonic() - worker.started)
+            worker.status = "idle"
+        elif message == "connected":
+            if worker.routed is not None:
+                worker.interactive = time.monotonic() - worker.routed
+                worker.routed = None
+                logger.info("Session on port %s interactive in %.2fs", worker.port, worker.interactive)
+            worker.status = "busy"
+        elif message == "released":
+            worker.sessions += 1
+            worker.status = "idle"
+            if worker.sessions >= self.max_sessions:
+                self.retire(worker)
+        self.fill()
+        self.changed.set()
+
+    def fill(self):
+        # keep pool_size workers that are starting or idle, within max_workers
+        spare = [w for w in self.workers.values() if w.status in ("starting", "idle")]
+        for _ in range(self.pool_size - len(spare)):
+            if len(self.workers) >= self.max_workers:
+                break
+            self.spawn()
+
+    def idle_worker(self):
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            # a routed session that never connected gives its worker back, unless
+            # its connected message is still waiting in the pipe
+            if worker.status == "routed" and now - worker.routed > CONNECT_TIMEOUT:
+                while worker.port in self.workers and worker.status == "routed" and worker.conn.poll():
+                    self.on_message(worker)
+                if worker.port not in self.workers:
+                    continue
+                if worker.status == "routed":
+                    logger.warning("Session routed to port %s never connected", worker.port)
+                    worker.status = "idle"
+            if worker.status == "idle":
+                return worker
+        return None
+
+    async def acquire(self, timeout=CONNECT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            worker = self.idle_worker()
+            if worker is not None:
+                worker.status = "routed"
+                worker.routed = time.monotonic()
+                self.fill()
+                return worker
+            self.fill()
+            self.changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def stop(self):
+        for worker in list(self.workers.values()):
+            self.retire(worker)
+
+    def status(self):
+        return {
+            str(port): {"status": worker.status, "sessions": worker.sessions, "time_to_interactive": worker.interactive}
+            for port, worker in self.workers.items()
+        }
+
+
+def create_app(pool):
+    async def route(request):
+        worker = await pool.acquire()
+        if worker is None:
+            raise web.HTTPServiceUnavailable(text="All simulators are busy, try again later")
+        host = request.url.host or "localhost"
+        raise web.HTTPFound("{0}://{1}:{2}/".format(request.url.scheme, host, worker.port))
+
+    async def status(request):
+        return web.json_response(pool.status())
+
+    async def on_startup(app):
+        pool.fill()
+
+    async def on_cleanup(app):
+        pool.stop()
+
+    app = web.Application()
+    app.router.add_get("/", route)
+    app.router.add_get("/status", status)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Ventilation Simulator from a pool of pre-warmed workers")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=2, help="Idle workers kept ready")
+    parser.add_argument("--max-workers", type=int, default=8, help="Upper bound on worker processes")
+    parser.add_argument("--max-sessions", type=int, default=10, help="Sessions served before a worker is recycled")
+    parser.add_argument("--worker-port", type=int, default=9000, help="First port used by the workers")
+    args, worker_argv = parser.parse_known_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # the workers share the data directory, clean up after the previous launcher before any of them starts
+    from .case import reap_cases
+    from .cli import parse_options
+    reap_cases(parse_options(worker_argv).data_dir)
+
+    pool = SessionPool(args.pool_size, args.max_workers, args.max_sessions, args.worker_port, worker_argv)
+    web.run_app(create_app(pool), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
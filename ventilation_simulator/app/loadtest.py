@@ -0,0 +1,290 @@
+"""
+Load test of one application process driven by simulated browsers
+
+The application is started against stubbed OpenFOAM commands and growing
+numbers of clients connect to it over the wslink 1.x JSON protocol spoken by
+trame. A first client uploads an STL, presses Set and Simulate so that there
+is a result on screen. Then every client subscribes to the images of the
+render view and keeps moving the slice and changing the block length. The
+round trip of every state update and the images and megabytes received per
+second by each client are reported for each number of clients.
+
+    ventilation-simulator-loadtest --clients 1,2,4,8 --duration 20
+
+Run it from the repository root, where the application finds its case
+templates. Options not known to the load test are passed to the application.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from . import stubs
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SECRET = "wslink-secret"
+STATE_TOPIC = "trame.state.topic"
+IMAGE_TOPIC = "viewport.image.push.subscription"
+VIEW_SIZE = [800, 600]
+
+# Seconds allowed for the application to start and for Set and Simulate to finish
+START_TIMEOUT = 120
+RUN_TIMEOUT = 300
+
+# Share of the actions of a client moving the slice, the rest change the block length
+SLICE_WEIGHT = 0.8
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class Client:
+    def __init__(self, url, name):
+        self.url = url
+        self.name = name
+        self.ws = None
+        self.reader = None
+        self.ids = itertools.count(1)
+        self.calls = dict()
+        self.state = dict()
+        self.latencies = []
+        self.errors = 0
+        self.images = 0
+        self.binary_bytes = 0
+
+    async def connect(self, session):
+        self.ws = await session.ws_connect(self.url, max_msg_size=0)
+        self.reader = asyncio.create_task(self.read())
+        await self.call("wslink.hello", {"secret": SECRET}, system=True)
+
+    async def close(self):
+        await self.ws.close()
+        await self.reader
+
+    async def call(self, method, *args, attachments=None, system=False):
+        rpc_id = "{0}:{1}:{2}".format("system" if system else "rpc", self.name, next(self.ids))
+        future = asyncio.get_running_loop().create_future()
+        self.calls[rpc_id] = future
+        # binary arguments are announced by key and sent ahead of the call referencing them
+        for key, data in (attachments or {}).items():
+            await self.ws.send_json({"wslink": "1.0", "method": "wslink.binary.attachment", "args": [key]})
+            await self.ws.send_bytes(data)
+        await self.ws.send_json({"wslink": "1.0", "id": rpc_id, "method": method, "args": list(args), "kwargs": {}})
+        message = await future
+        if "error" in message:
+            raise RuntimeError("{0} failed: {1}".format(method, message["error"]))
+        return message.get("result")
+
+    async def read(self):
+        async for message in self.ws:
+            if message.type == aiohttp.WSMsgType.BINARY:
+                self.binary_bytes += len(message.data)
+                continue
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(message.data)
+            rpc_id = data.get("id") or ""
+            if rpc_id.startswith("publish:{0}:".format(IMAGE_TOPIC)):
+                self.images += 1
+            elif rpc_id.startswith("publish:{0}:".format(STATE_TOPIC)):
+                self.on_state(data.get("result"))
+            elif rpc_id in self.calls:
+                self.calls.pop(rpc_id).set_result(data)
+        for future in self.calls.values():
+            if not future.done():
+                future.set_exception(ConnectionError("{0} disconnected".format(self.name)))
+        self.calls.clear()
+
+    def on_state(self, changes):
+        if isinstance(changes, dict):
+            self.state.update(changes)
+        elif isinstance(changes, list):
+            for change in changes:
+                self.state[change["key"]] = change.get("value")
+
+    async def wait_state(self, key, value, timeout=RUN_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while self.state.get(key) != value:
+            if time.monotonic() > deadline:
+                raise TimeoutError("{0} did not become {1} within {2}s".format(key, value, timeout))
+            await asyncio.sleep(0.1)
+
+    async def update(self, key, value):
+        start = time.perf_counter()
+        try:
+            await self.call("trame.state.update", [{"key": key, "value": value}])
+        except RuntimeError as error:
+            logger.warning("%s: %s", self.name, error)
+            self.errors += 1
+            return
+        self.latencies.append(time.perf_counter() - start)
+
+    async def trigger(self, name):
+        return await self.call("trame.trigger", name, [], {})
+
+    async def observe_view(self):
+        # an unknown view id selects the active view, the reply names it
+        result = await self.call("viewport.image.push.observer.add", "-1")
+        view_id = result.get("viewId", "-1") if isinstance(result, dict) else "-1"
+        await self.call("viewport.image.push", {
+            "view": view_id, "size": VIEW_SIZE, "mtime": 0, "quality": 80, "localTime": 0,
+        })
+
+
+async def prepare(session, url):
+    # one result on screen before the clients start moving the slice
+    client = Client(url, "setup")
+    await client.connect(session)
+    await client.call("trame.state.update", [
+        {"key": "files", "value": [{"name": "box.stl", "size": len(stubs.STL), "type": "model/stl",
+                                    "lastModified": 0, "content": "wslink_bin0"}]},
+        {"key": "inlet", "value": 0},
+        {"key": "outlet", "value": 1},
+        {"key": "aeroRoughness", "value": 0},
+    ], attachments={"wslink_bin0": stubs.STL})
+    # forget the flags reported so far to wait for those of this run
+    client.state.pop("set_running", None)
+    start = time.perf_counter()
+    await client.trigger("run_set")
+    await client.wait_state("set_running", False)
+    logger.info("Set took %.1fs", time.perf_counter() - start)
+    client.state.pop("postProcessing", None)
+    start = time.perf_counter()
+    await client.trigger("run_sim")
+    await client.wait_state("postProcessing", False)
+    logger.info("Simulate took %.1fs", time.perf_counter() - start)
+    await client.close()
+
+
+async def drive(session, client, duration, think):
+    await client.connect(session)
+    await client.observe_view()
+    client.images = client.binary_bytes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        if random.random() < SLICE_WEIGHT:
+            await client.update("slicePos", round(random.uniform(0.5, 4.5), 2))
+        else:
+            await client.update("myLength", random.choice([4, 5, 6]))
+        await asyncio.sleep(think)
+    await client.close()
+    return time.perf_counter() - start
+
+
+def summarize(clients, elapsed):
+    latencies = [latency * 1000 for client in clients for latency in client.latencies]
+    return {
+        "clients": len(clients),
+        "updates": len(latencies),
+        "errors": sum(client.errors for client in clients),
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else None,
+        # rates per client, comparable as the number of clients grows
+        "images_per_s": sum(client.images for client in clients) / elapsed / len(clients),
+        "mb_per_s": sum(client.binary_bytes for client in clients) / elapsed / len(clients) / 2 ** 20,
+    }
+
+
+async def wait_ready(session, http_url, process, timeout=START_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("The application exited with code {0}".format(process.returncode))
+        try:
+            async with session.get(http_url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("The application did not start within {0}s".format(timeout))
+
+
+async def run(url, counts, duration, think, process=None):
+    http_url = url.replace("ws", "http", 1).rsplit("/ws", 1)[0] + "/"
+    results = []
+    async with aiohttp.ClientSession() as session:
+        await wait_ready(session, http_url, process)
+        await prepare(session, url)
+        for count in counts:
+            clients = [Client(url, "c{0}".format(i)) for i in range(count)]
+            elapsed = await asyncio.gather(*(drive(session, client, duration, think) for client in clients))
+            result = summarize(clients, max(elapsed))
+            logger.info("%s clients: p50 %s ms, p99 %s ms, %.1f images/s per client", count, \
+                        result["p50_ms"], result["p99_ms"], result["images_per_s"])
+            results.append(result)
+    return results
+
+
+def start_app(port, workdir, app_argv):
+    bin_dir = stubs.install(os.path.join(workdir, "bin"))
+    env = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""))
+    cmd = [sys.executable, "-m", "ventilation_simulator.app.main", "--server", "--port", str(port), \
+           "--data-dir", os.path.join(workdir, "data")] + list(app_argv)
+    return subprocess.Popen(cmd, env=env)
+
+
+def report(results):
+    columns = ["clients", "updates", "errors", "p50_ms", "p90_ms", "p99_ms", "max_ms", "images_per_s", "mb_per_s"]
+    lines = ["  ".join("{0:>12}".format(column) for column in columns)]
+    for result in results:
+        lines.append("  ".join(
+            "{0:>12}".format("-" if result[column] is None else
+                             "{0:.1f}".format(result[column]) if isinstance(result[column], float) else
+                             result[column])
+            for column in columns
+        ))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how one Ventilation Simulator process copes with concurrent clients")
+    parser.add_argument("--clients", default="1,2,4,8", help="Comma separated numbers of concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds each number of clients is driven")
+    parser.add_argument("--think", type=float, default=0.1, help="Seconds a client waits between actions")
+    parser.add_argument("--port", type=int, default=8090, help="Port of the application started for the test")
+    parser.add_argument("--url", help="Websocket of an application already running, e.g. ws://localhost:8080/ws")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args, app_argv = parser.parse_known_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    counts = [int(count) for count in args.clients.split(",")]
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        url = args.url
+        if url is None:
+            process = start_app(args.port, workdir, app_argv)
+            url = "ws://localhost:{0}/ws".format(args.port)
+        try:
+            results = asyncio.run(run(url, counts, args.duration, args.think, process))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(report(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fw:
+            json.dump(results, fw, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,21 @@
-from .core import create_engine
+from .cli import add_arguments
 
 def main(server=None, **kwargs):
+    from trame.app import get_server
+
+    # Get or create server, answer --help before ParaView is imported
+    if server is None:
+        server = get_server()
+    if isinstance(server, str):
+        server = get_server(server)
+    args, _ = add_arguments(server.cli).parse_known_args()
+
+    # the server owns its data directory, clean up after the previous one
+    from .case import reap_cases
+    reap_cases(args.data_dir)
+
+    from .core import create_engine
+
     engine = create_engine(server)
     engine.server.start(**kwargs)
 
@@ -0,0 +1,163 @@
+"""
+Dependency graph of case stages run concurrently on a worker pool
+
+A stage declares the files it reads (``inputs``), the files it produces
+(``outputs``), the parameters it depends on and the stages it runs ``after``.
+Stages whose dependencies are done run in parallel on a thread pool. A stage
+is skipped when its signature (parameters, input file contents and the
+signatures of its dependencies) matches the one recorded by its last run in
+the workspace, its outputs still exist and none of its dependencies ran.
+"""
+import os
+import json
+import time
+import hashlib
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STAMP_FILE = ".pipeline.json"
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=(), after=(), params=None, progress=0):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.params = params or {}
+        self.progress = progress
+
+
+def read_stamps(workspace):
+    """Return the signatures of the stages last run in workspace, by stage name"""
+    try:
+        with open(os.path.join(workspace, STAMP_FILE), "r", encoding="utf-8") as fr:
+            return json.load(fr)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def hash_path(digest, path, workspace=None):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                hash_path(digest, os.path.join(root, name), workspace)
+        return
+    # files of the workspace by their relative path, so a copy of the workspace keeps its signatures
+    name = path
+    if workspace is not None and os.path.commonpath([os.path.abspath(path), os.path.abspath(workspace)]) \
+            == os.path.abspath(workspace):
+        name = os.path.relpath(path, workspace)
+    digest.update(name.encode("utf-8"))
+    if not os.path.exists(path):
+        digest.update(b"missing")
+        return
+    with open(path, "rb") as fr:
+        for chunk in iter(lambda: fr.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+class Pipeline:
+    def __init__(self, workspace, stages, max_workers=4):
+        self.workspace = workspace
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        for stage in stages:
+            for dep in stage.after:
+                if dep not in self.stages:
+                    raise ValueError("Stage {0} depends on unknown stage {1}".format(stage.name, dep))
+
+    @property
+    def stamp_path(self):
+        return os.path.join(self.workspace, STAMP_FILE)
+
+    def load_stamps(self):
+        return read_stamps(self.workspace)
+
+    def save_stamps(self, stamps):
+        with open(self.stamp_path, "w", encoding="utf-8") as fw:
+            json.dump(stamps, fw, indent=2)
+
+    def path(self, path):
+        return path if os.path.isabs(path) else os.path.join(self.workspace, path)
+
+    def signature(self, stage, signatures):
+        digest = hashlib.sha1()
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode("utf-8"))
+        for path in stage.inputs:
+            hash_path(digest, self.path(path), self.workspace)
+        for dep in sorted(stage.after):
+            digest.update(signatures[dep].encode("utf-8"))
+        return digest.hexdigest()
+
+    def up_to_date(self, stage, signature, stamps, ran):
+        if any(ran[dep] for dep in stage.after):
+            return False
+        if stamps.get(stage.name) != signature:
+            return False
+        return all(os.path.exists(self.path(path)) for path in stage.outputs)
+
+    def execute(self, stage, stamps, signatures, ran):
+        signature = self.signature(stage, signatures)
+        signatures[stage.name] = signature
+        if self.up_to_date(stage, signature, stamps, ran):
+            ran[stage.name] = False
+            return None
+        start = time.perf_counter()
+        stage.func()
+        ran[stage.name] = True
+        return time.perf_counter() - start
+
+    async def run(self, on_stage_done=None):
+        """Run every stage and return {name: seconds} (None for skipped stages)
+
+        ``on_stage_done(stage, seconds)`` is called on the event loop thread.
+        """
+        loop = asyncio.get_running_loop()
+        stamps = self.load_stamps()
+        signatures, ran, results = dict(), dict(), dict()
+        pending = dict(self.stages)
+        running = dict()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                while pending or running:
+                    for name, stage in list(pending.items()):
+                        if all(dep in results for dep in stage.after):
+                            del pending[name]
+                            future = loop.run_in_executor(pool, self.execute, stage, stamps, signatures, ran)
+                            running[future] = stage
+                    if not running:
+                        raise ValueError("Circular dependency between stages: {0}".format(sorted(pending)))
+
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        try:
+                            seconds = future.result()
+                        except Exception:
+                            stamps.pop(stage.name, None)
+                            self.save_stamps(stamps)
+                            raise
+                        results[stage.name] = seconds
+                        stamps[stage.name] = signatures[stage.name]
+                        self.save_stamps(stamps)
+                        if seconds is None:
+                            logger.info("Skipped %s, inputs unchanged", stage.name)
+                        else:
+                            logger.info("Ran %s in %.2fs", stage.name, seconds)
+                        if on_stage_done is not None:
+                            on_stage_done(stage, seconds)
+            finally:
+                # let stages already started finish before leaving the pool
+                if running:
+                    await asyncio.wait(running)
+
+        return results
@@ -0,0 +1,142 @@
+"""
+Output profiles of a simulation and the functionObjects they add to controlDict,
+and solver presets written to fvSolution
+"""
+
+# writeFormat, writePrecision and writeCompression of controlDict, the fields
+# reconstructed for the viewer (None for all) and whether slices and probes are
+# sampled by the solver while it runs. OpenFOAM ignores writePrecision and
+# turns writeCompression off for binary output, so the lean profile writes
+# gzipped ascii with 6 significant digits, which the OpenFOAM reader of
+# ParaView reads as well. Most of its saving comes from writing the volume at
+# the end time only, the snapshots in between are the sampled slices.
+OUTPUT_PROFILES = {
+    "full": {
+        "writeFormat": "binary",
+        "writePrecision": 12,
+        "writeCompression": "off",
+        "fields": None,
+        "sampling": False,
+    },
+    "lean": {
+        "writeFormat": "ascii",
+        "writePrecision": 6,
+        "writeCompression": "on",
+        "fields": ["U"],
+        "sampling": True,
+    },
+}
+
+# Heights [m] of the horizontal slices and probes sampled in the lean profile
+SLICE_HEIGHTS = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 7.5, 10.0]
+PROBE_HEIGHTS = [1.0, 2.0, 5.0]
+
+SAMPLES_DIR = "slices"
+
+
+def slice_heights(height):
+    heights = [h for h in SLICE_HEIGHTS if h < height]
+    return heights or [height / 2]
+
+
+def surface_name(height):
+    return "z{0}".format(str(float(height)).replace('.', '_'))
+
+
+def sampling_functions(heights, probes, interval):
+    """Return controlDict lines sampling U on horizontal planes and U, p at probes"""
+    line = ["functions\n", "{\n",
+            "    {0}\n".format(SAMPLES_DIR), "    {\n",
+            "        type            surfaces;\n",
+            "        libs            (\"libsampling.so\");\n",
+            "        writeControl    timeStep;\n",
+            "        writeInterval   {0};\n".format(interval),
+            "        surfaceFormat   vtk;\n",
+            "        interpolationScheme cellPoint;\n",
+            "        fields          (U);\n",
+            "        surfaces\n", "        (\n"]
+    for height in heights:
+        line += ["            {0}\n".format(surface_name(height)), "            {\n",
+                 "                type        cuttingPlane;\n",
+                 "                planeType   pointAndNormal;\n",
+                 "                pointAndNormalDict\n", "                {\n",
+                 "                    point   (0 0 {0});\n".format(height),
+                 "                    normal  (0 0 1);\n",
+                 "                }\n",
+                 "                interpolate true;\n",
+                 "            }\n"]
+    line += ["        );\n", "    }\n", "\n",
+             "    probes\n", "    {\n",
+             "        type            probes;\n",
+             "        libs            (\"libsampling.so\");\n",
+             "        writeControl    timeStep;\n",
+             "        writeInterval   1;\n",
+             "        fields          (U p);\n",
+             "        probeLocations\n", "        (\n"]
+    for probe in probes:
+        line.append("            ({0} {1} {2})\n".format(*probe))
+    line += ["        );\n", "    }\n", "}\n", "\n"]
+    return line
+
+
+# Linear solvers, SIMPLE controls and relaxation factors written to fvSolution.
+# "balanced" keeps the original settings of the case template.
+SOLVER_PRESETS = {
+    "fast": {
+        "p": {"tolerance": "1e-6", "relTol": "0.1", "smoother": "GaussSeidel",
+              "nCellsInCoarsestLevel": "100", "nPreSweeps": "0", "nPostSweeps": "2"},
+        "transport": {"smoother": "GaussSeidel", "tolerance": "1e-6", "relTol": "0.1"},
+        "nNonOrthogonalCorrectors": 0,
+        "residualControl": {"p": "1e-2", "U": "1e-3", "\"(k|epsilon)\"": "1e-3"},
+        "relaxation": {"p": "0.3", "U": "0.7", "k": "0.7", "epsilon": "0.7"},
+    },
+    "balanced": {
+        "p": {"tolerance": "1e-7", "relTol": "0.1", "smoother": "GaussSeidel"},
+        "transport": {"smoother": "GaussSeidel", "tolerance": "1e-8", "relTol": "0.1"},
+        "nNonOrthogonalCorrectors": 0,
+        "residualControl": {"p": "1e-3", "U": "1e-4", "\"(k|epsilon)\"": "1e-4"},
+        "relaxation": {"p": "0.3", "U": "0.7", "k": "0.7", "epsilon": "0.7"},
+    },
+    "accurate": {
+        "p": {"tolerance": "1e-8", "relTol": "0.01", "smoother": "DICGaussSeidel",
+              "nCellsInCoarsestLevel": "10", "agglomerator": "faceAreaPair", "mergeLevels": "1"},
+        "transport": {"smoother": "symGaussSeidel", "tolerance": "1e-9", "relTol": "0.05"},
+        "nNonOrthogonalCorrectors": 1,
+        "residualControl": {"p": "1e-4", "U": "1e-5", "\"(k|epsilon)\"": "1e-5"},
+        "relaxation": {"p": "0.2", "U": "0.5", "k": "0.5", "epsilon": "0.5"},
+    },
+}
+
+
+def entry(name, value, indent):
+    return "{0}{1:<17}{2};\n".format(" " * indent, name, value)
+
+
+def fv_solution(preset):
+    """Return the fvSolution lines between the header and the cache entry"""
+    settings = SOLVER_PRESETS[preset]
+    line = ["solvers\n", "{\n", "    p\n", "    {\n", entry("solver", "GAMG", 8)]
+    line += [entry(name, value, 8) for name, value in settings["p"].items()]
+    line += ["    }\n", "\n",
+             "    Phi\n", "    {\n",
+             entry("solver", "GAMG", 8), entry("tolerance", "1e-6", 8),
+             entry("relTol", "0.01", 8), entry("smoother", "GaussSeidel", 8),
+             "    }\n"]
+    for field in ["U", "k", "epsilon"]:
+        line += ["\n", "    {0}\n".format(field), "    {\n", entry("solver", "smoothSolver", 8)]
+        line += [entry(name, value, 8) for name, value in settings["transport"].items()]
+        line += [entry("nSweeps", "1", 8), "    }\n"]
+    line += ["}\n", "\n",
+             "potentialFlow\n", "{\n", "    nNonOrthogonalCorrectors 3;\n", "}\n", "\n",
+             "SIMPLE\n", "{\n",
+             "    nNonOrthogonalCorrectors {0};\n".format(settings["nNonOrthogonalCorrectors"]), "\n",
+             "    residualControl\n", "    {\n"]
+    line += ["        {0:<16}{1};\n".format(name, value) for name, value in settings["residualControl"].items()]
+    relaxation = settings["relaxation"]
+    line += ["    }\n", "}\n", "\n",
+             "relaxationFactors\n", "{\n", "    fields\n", "    {\n",
+             "        {0:<16}{1};\n".format("p", relaxation["p"]),
+             "    }\n", "    equations\n", "    {\n"]
+    line += ["        {0:<16}{1};\n".format(field, relaxation[field]) for field in ["U", "k", "epsilon"]]
+    line += ["    }\n", "}\n", "\n"]
+    return line
@@ -0,0 +1,63 @@
+"""
+Bookkeeping of the ParaView proxies created by an engine
+
+Every reader, filter and producer is registered in a named group when it is
+created. Releasing a group deletes its proxies newest first, so consumers go
+before the sources they read from and their representations go with them.
+"""
+import os
+import logging
+
+from paraview import simple, servermanager
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Proxy manager groups counted in the memory report
+PROXY_GROUPS = ["sources", "representations", "lookup_tables", "piecewise_functions"]
+
+
+class ProxyTracker:
+    def __init__(self):
+        self.groups = dict()
+
+    def track(self, group, proxy):
+        self.groups.setdefault(group, []).append(proxy)
+        return proxy
+
+    def release(self, group):
+        proxies = self.groups.pop(group, [])
+        for proxy in reversed(proxies):
+            simple.Delete(proxy)
+        return len(proxies)
+
+    def release_all(self):
+        for group in list(self.groups):
+            self.release(group)
+
+    def counts(self):
+        return {group: len(proxies) for group, proxies in self.groups.items()}
+
+
+def live_proxies():
+    """Return the number of proxies registered per group of the proxy manager"""
+    pxm = servermanager.ProxyManager()
+    return {group: len(pxm.GetProxiesInGroup(group)) for group in PROXY_GROUPS}
+
+
+def rss_bytes():
+    """Return the resident set size of this process, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as fr:
+            return int(fr.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_report(tracker):
+    return {
+        "tracked": tracker.counts(),
+        "live": live_proxies(),
+        "rss": rss_bytes(),
+    }
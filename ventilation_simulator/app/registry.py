@@ -0,0 +1,124 @@
+"""
+Persistent registry of simulation cases backed by SQLite
+
+Every case workspace under the data directory gets a row holding its inputs,
+status, artifacts and metrics, so completed cases survive server restarts and
+can be reopened without recomputing them.
+"""
+import json
+import time
+import sqlite3
+import threading
+
+
+# Name of the database in the data directory
+REGISTRY_FILE = 'cases.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    status TEXT NOT NULL,
+    case_dir TEXT NOT NULL,
+    parent TEXT,
+    inputs TEXT NOT NULL DEFAULT '{}',
+    artifacts TEXT NOT NULL DEFAULT '{}',
+    metrics TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS cases_updated ON cases (updated DESC);
+CREATE INDEX IF NOT EXISTS cases_status_updated ON cases (status, updated DESC);
+"""
+
+JSON_COLUMNS = ["inputs", "artifacts", "metrics"]
+
+# Statuses of cases a server is still working on, none of them survives a restart
+ACTIVE_STATUSES = ["queued", "meshing", "running"]
+
+
+class CaseRegistry:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        record = dict(row)
+        for column in JSON_COLUMNS:
+            record[column] = json.loads(record[column])
+        return record
+
+    def create(self, case_id, case_dir, status="created", parent=None, inputs=None):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO cases (id, created, updated, status, case_dir, parent, inputs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (case_id, now, now, status, case_dir, parent, json.dumps(inputs or {})),
+            )
+        return case_id
+
+    def update(self, case_id, status=None, inputs=None, artifacts=None, metrics=None):
+        columns = {"updated": time.time()}
+        if status is not None:
+            columns["status"] = status
+        for column, value in zip(JSON_COLUMNS, [inputs, artifacts, metrics]):
+            if value is not None:
+                columns[column] = json.dumps(value)
+        assignments = ", ".join("{0} = ?".format(column) for column in columns)
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE cases SET {0} WHERE id = ?".format(assignments),
+                list(columns.values()) + [case_id],
+            )
+
+    def delete(self, case_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cases WHERE id = ?", (case_id,))
+
+    def get(self, case_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM cases WHERE id = ?", (case_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list(self, status=None, offset=0, limit=20):
+        """Return a page of cases, most recently updated first"""
+        query = "SELECT * FROM cases"
+        args = []
+        if status is not None:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY updated DESC, rowid DESC LIMIT ? OFFSET ?"
+        args += [limit, offset]
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def fail_active(self, error):
+        """Mark the cases left active by a previous server as failed, return their number"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE cases SET status = 'failed', updated = ?, metrics = ? WHERE status IN ({0})".format(placeholders),
+                [time.time(), json.dumps({"error": error})] + ACTIVE_STATUSES,
+            ).rowcount
+
+    def count(self, status=None):
+        query = "SELECT COUNT(*) FROM cases"
+        args = []
+        if status is not None:
+            query += " WHERE status = ?"
+            args.append(status)
+        with self._lock:
+            return self._db.execute(query, args).fetchone()[0]
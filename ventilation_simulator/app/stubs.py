@@ -0,0 +1,119 @@
+"""
+Stand-ins for the OpenFOAM applications used by tests and load tests
+
+Each stub writes just enough of a case for the next stage and the viewer:
+a single hexahedron as the mesh, a uniform velocity as the result and the
+log lines the engine parses. ``install(bin_dir)`` writes shell scripts that
+shadow the real applications once ``bin_dir`` is first on the PATH.
+
+    python -m ventilation_simulator.app.stubs blockMesh
+"""
+import os
+import sys
+
+from .executor import Executor
+
+
+# The checkout holding the templates, cases read them relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMANDS = [
+    "surfaceFeatures", "blockMesh", "snappyHexMesh", "checkMesh", "decomposePar",
+    "renumberMesh", "potentialFoam", "simpleFoam", "reconstructPar", "paraFoam",
+]
+
+# a small closed surface in ASCII STL
+STL = b"""solid box
+facet normal 0 0 1
+outer loop
+vertex 0 0 1
+vertex 1 0 1
+vertex 0 1 1
+endloop
+endfacet
+endsolid box
+"""
+
+# a single hexahedron with one wall patch, faces pointing out of the cell
+POINTS = [(-5, -5, 0), (5, -5, 0), (5, 5, 0), (-5, 5, 0), (-5, -5, 5), (5, -5, 5), (5, 5, 5), (-5, 5, 5)]
+FACES = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (0, 4, 7, 3)]
+END_TIME = "5"
+
+
+def foam_file(path, cls, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fw:
+        fw.write("FoamFile\n{\n    version 2.0;\n    format ascii;\n    class %s;\n    object %s;\n}\n%s\n"
+                 % (cls, os.path.basename(path), body))
+
+
+def write_mesh(case_dir):
+    mesh = os.path.join(case_dir, "constant", "polyMesh")
+    foam_file(os.path.join(mesh, "points"), "vectorField",
+              "8\n(\n{0}\n)".format("\n".join("({0} {1} {2})".format(*p) for p in POINTS)))
+    foam_file(os.path.join(mesh, "faces"), "faceList",
+              "6\n(\n{0}\n)".format("\n".join("4({0} {1} {2} {3})".format(*f) for f in FACES)))
+    foam_file(os.path.join(mesh, "owner"), "labelList", "6\n(\n0 0 0 0 0 0\n)")
+    foam_file(os.path.join(mesh, "neighbour"), "labelList", "0\n(\n)")
+    foam_file(os.path.join(mesh, "boundary"), "polyBoundaryMesh",
+              "1\n(\n    walls\n    {\n        type wall;\n        nFaces 6;\n        startFace 0;\n    }\n)")
+
+
+def write_result(case_dir, time=END_TIME):
+    foam_file(os.path.join(case_dir, time, "U"), "volVectorField",
+              "dimensions [0 1 -1 0 0 0 0];\ninternalField uniform (1 0 0);\n"
+              "boundaryField\n{\n    walls\n    {\n        type fixedValue;\n        value uniform (1 0 0);\n    }\n}")
+
+
+def run(name, case_dir):
+    """Do the work of the stubbed application in case_dir and return its log"""
+    if name == "surfaceFeatures":
+        # the features of every surface, the dictionary naming one of them is not read
+        surfaces = os.path.join(case_dir, "constant", "triSurface")
+        for file in os.listdir(surfaces):
+            if file.lower().endswith(".stl"):
+                open(os.path.join(surfaces, "{0}.eMesh".format(file.split('.')[0])), "a").close()
+    elif name in ("blockMesh", "snappyHexMesh"):
+        write_mesh(case_dir)
+    elif name == "checkMesh":
+        return "Mesh OK.\n"
+    elif name == "decomposePar":
+        os.makedirs(os.path.join(case_dir, "processor0", "0"), exist_ok=True)
+    elif name == "simpleFoam":
+        return "Time = 1\n\nSIMPLE solution converged in 1 iterations\n"
+    elif name == "reconstructPar":
+        write_result(case_dir)
+    elif name == "paraFoam":
+        open(os.path.join(case_dir, "{0}.foam".format(os.path.basename(case_dir))), "a").close()
+    return ""
+
+
+class StubExecutor(Executor):
+    """Executor running the stubs in process, recording the applications it ran"""
+
+    def __init__(self):
+        self.commands = []
+
+    def run(self, cmd, cwd, log_path, nprocs=None):
+        self.commands.append(cmd[0])
+        with open(log_path, "w", encoding="utf-8") as fw:
+            fw.write(run(cmd[0], cwd))
+        return 0
+
+
+def install(bin_dir):
+    # mpirun drops its options and runs the stubbed application once
+    os.makedirs(bin_dir, exist_ok=True)
+    scripts = {name: '#!/bin/sh\nPYTHONPATH="{0}${{PYTHONPATH:+:$PYTHONPATH}}" exec "{1}" -m {2} {3} "$@"\n'.format(
+        ROOT, sys.executable, __name__, name) for name in COMMANDS}
+    scripts["mpirun"] = '#!/bin/sh\nwhile [ "${1#-}" != "$1" ]; do shift 2; done\nexec "$@"\n'
+    for name, script in scripts.items():
+        path = os.path.join(bin_dir, name)
+        with open(path, "w", encoding="utf-8") as fw:
+            fw.write(script)
+        os.chmod(path, 0o755)
+    return bin_dir
+
+
+if __name__ == "__main__":
+    sys.stdout.write(run(sys.argv[1], os.getcwd()))
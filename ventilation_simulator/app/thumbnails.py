@@ -0,0 +1,48 @@
+"""
+Thumbnails of completed runs for the gallery of saved cases
+
+Every completed run is rendered once, offscreen, into a few small images
+kept in the thumbnails directory of its case. The gallery loads them over
+HTTP, so browsing past runs reads no mesh and renders nothing on the server.
+
+    GET /thumbnails/<case_id>/<name>.png
+"""
+import os
+
+from aiohttp import web
+
+
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAILS = ["slice", "overview"]
+THUMBNAIL_SIZE = [320, 240]
+
+# Height of the slice in the thumbnail, the default of the slice slider
+THUMBNAIL_SLICE_HEIGHT = 1.0
+
+
+def thumbnail_path(case_dir, name):
+    return os.path.join(case_dir, THUMBNAIL_DIR, '{0}.png'.format(name))
+
+
+def thumbnail_urls(case):
+    """Return the urls of the thumbnails of a registry record, None before they are rendered"""
+    names = case["artifacts"].get("thumbnails")
+    if not names:
+        return None
+    return {name: "thumbnails/{0}/{1}.png".format(case["id"], name) for name in names}
+
+
+def add_routes(app, registry):
+    async def thumbnail(request):
+        case_id = request.match_info["case_id"]
+        name = request.match_info["name"]
+        case = registry.get(case_id)
+        if case is None or name not in case["artifacts"].get("thumbnails", {}):
+            raise web.HTTPNotFound(text="No thumbnail {0} for case {1}".format(name, case_id))
+        path = thumbnail_path(case["case_dir"], name)
+        if not os.path.exists(path):
+            raise web.HTTPNotFound(text="No thumbnail {0} for case {1}".format(name, case_id))
+        # completed cases are never modified, nor are their thumbnails
+        return web.FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+    app.router.add_get("/thumbnails/{case_id}/{name}.png", thumbnail)